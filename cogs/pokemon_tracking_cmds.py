@@ -5,6 +5,7 @@ from discord.ext import commands
 import tracking.pokemon as poketrack
 import tracking.pokemon.factory as poketrack_factory
 import scrapers
+import scrapers.executor as executor
 
 class PokemonTrackingCommands(commands.Cog):
     undo_count = 10 # default value
@@ -20,6 +21,7 @@ class PokemonTrackingCommands(commands.Cog):
             print('Failed to find environment variable POKEMON_TRACKING_TYPE. Using FILES as default.')
             POKEMON_TRACKING_TYPE = poketrack_factory.TrackingTypes.FILES
         self.pokemon_tracking = poketrack_factory.tracking_factory(POKEMON_TRACKING_TYPE)
+        self.pokemon_tracking.start_prefetch()
 
         # Create an undo list for the undo command
         try:
@@ -48,10 +50,15 @@ class PokemonTrackingCommands(commands.Cog):
     async def __pokemon_lookup_tracking_cmd(self, ctx, tracking_fn, pokemon, *args, publish_on_success=True) -> bool:
         user = self.get_user(ctx)
         try:
-            result = tracking_fn(user, pokemon, *args)
+            # Tracking calls run on the scraper thread pool, the tracking class locks its state while it's modified and saved
+            result = await executor.run(tracking_fn, user, pokemon, *args)
             if publish_on_success:
                 await ctx.reply(result)
             return (True, result)
+        except scrapers.BusyException as e:
+            print(f'BusyException in {tracking_fn.__name__} call: {e}')
+            await ctx.reply(f'The Pokemon Center is full right now! Please try again in a moment.')
+            return (False, None)
         except scrapers.SuggestionException as suggestions:
             await ctx.reply(f'Pokemon {pokemon} was not found in the Pokedex. Did you mean: {suggestions}?')
             return (False, None)
@@ -62,8 +69,13 @@ class PokemonTrackingCommands(commands.Cog):
     async def __generic_tracking_cmd(self, ctx, tracking_fn, *args) -> bool:
         user = self.get_user(ctx)
         try:
-            await ctx.reply(tracking_fn(user, *args))
+            result = await executor.run(tracking_fn, user, *args)
+            await ctx.reply(result)
             return True
+        except scrapers.BusyException as e:
+            print(f'BusyException in {tracking_fn.__name__} call: {e}')
+            await ctx.reply(f'The Pokemon Center is full right now! Please try again in a moment.')
+            return False
         except (scrapers.SuggestionException, poketrack.PokemonTrackingException) as e:
             await ctx.reply(e)
             return False
@@ -80,7 +92,11 @@ class PokemonTrackingCommands(commands.Cog):
         # Try and remove the pokemon
         user = self.get_user(ctx)
         try:
-            pokemon = self.pokemon_tracking.remove_pokemon(user, pokemon_id)
+            pokemon = await executor.run(self.pokemon_tracking.remove_pokemon, user, pokemon_id)
+        except scrapers.BusyException as e:
+            print(f'BusyException in remove_pokemon call: {e}')
+            await ctx.reply(f'The Pokemon Center is full right now! Please try again in a moment.')
+            return
         except poketrack.PokemonTrackingException as e:
             await ctx.reply(e)
             return
@@ -192,7 +208,7 @@ class PokemonTrackingCommands(commands.Cog):
 
     @commands.command("track-get-stats")
     async def get_pokemon_stats(self, ctx, pokemon_id: int, level: int):
-        await ctx.reply(self.pokemon_tracking.get_pokemon_stats_str(self.get_user(ctx), pokemon_id, level))
+        await self.__generic_tracking_cmd(ctx, self.pokemon_tracking.get_pokemon_stats_str, pokemon_id, level)
 
     @commands.command("track-set-evolution")
     async def set_pokemon_evolution(self, ctx, pokemon_id: int, evolution_name: str, *args):
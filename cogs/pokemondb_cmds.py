@@ -1,7 +1,11 @@
+import io
 import discord
 from discord.ext import commands
 
-import scrapers.pokebase as pokemondb
+import scrapers.pokedex as pokemondb
+import scrapers.images as images
+from scrapers.evolutions import get_evolution_graph
+from scrapers.egg_groups import get_egg_group_index
 
 class PokemonDBCommands(commands.Cog):
     """ Contains commands used to access pokemondb. """
@@ -9,11 +13,33 @@ class PokemonDBCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+        # Build the evolution graph and egg group index up front so the first lookups don't pay for them
+        graph = get_evolution_graph()
+        if graph is not None:
+            print(f'Loaded evolution graph with {len(graph.chains)} chains.')
+        egg_group_index = get_egg_group_index()
+        if egg_group_index is not None:
+            print(f'Loaded egg group index with {len(egg_group_index.species_masks)} species.')
+
     @commands.Cog.listener()
     async def on_ready(self):
         print(f'PokemonDBCommands connected as User: {self.bot.user}, ID: {self.bot.user.id}.')
 
-    async def __pokemon_lookup_cmd(self, ctx, lookup_fn, pokemon: str, *args, results_fm=lambda r: ', '.join(r)):
+    async def __reply_joined(self, ctx, results: list, join_str: str):
+        # Discord rejects messages over 2000 characters, so long lists are split over several replies
+        result_str = ''
+        for i in range(len(results)):
+            if i == 0:
+                result_str = str(results[i])
+            elif (len(result_str) + len(str(results[i])) + len(join_str)) > 2000:
+                await ctx.reply(result_str)
+                result_str = str(results[i])
+            else:
+                result_str += join_str + str(results[i])
+        if result_str:
+            await ctx.reply(result_str)
+
+    async def __pokemon_lookup_cmd(self, ctx, lookup_fn, pokemon: str, *args, results_fm=lambda r: ', '.join(r), join_str=None):
         # Validate args
         if len(args) > 0:
             await ctx.reply(f"Oh my, that's a lot of wild pokemon there. I can only lookup one at a time.")
@@ -21,7 +47,10 @@ class PokemonDBCommands(commands.Cog):
 
         # Get the field
         try:
-            results = lookup_fn(pokemon)
+            results = await lookup_fn(pokemon)
+        except pokemondb.WebBusyException as e:
+            print(f'WebBusyException in {lookup_fn.__name__} call: {e}\n')
+            await ctx.reply(f"The Pokemon Center is full right now! Please try {pokemon} again in a moment.")
         except pokemondb.WebRequestException as e:
             print(f'WebRequestException in get_ev_yield call: {e}\n')
             await ctx.reply(f"{str(self.bot.user).split('#')[0]} whited out! Turns out {pokemon} isn't a real pokemon.")
@@ -31,7 +60,10 @@ class PokemonDBCommands(commands.Cog):
         except pokemondb.WebSuggestionException as suggestions:
             await ctx.reply(f'Pokemon {pokemon} was not found in the Pokedex. Did you mean: {suggestions}?')
         else:
-            await ctx.reply(results_fm(results))
+            if join_str is not None and len(results) > 0:
+                await self.__reply_joined(ctx, results, join_str)
+            else:
+                await ctx.reply(results_fm(results))
 
     async def __egg_group_lookup_cmd(self, ctx, lookup_fn, egg_group: str, *args, join_str=', '):
         # Validate args
@@ -40,7 +72,10 @@ class PokemonDBCommands(commands.Cog):
 
         # Get the field
         try:
-            results = lookup_fn(egg_group)
+            results = await lookup_fn(egg_group)
+        except pokemondb.WebBusyException as e:
+            print(f'WebBusyException in {lookup_fn.__name__} call: {e}\n')
+            await ctx.reply(f"The Pokemon daycare is full right now! Please try {egg_group} again in a moment.")
         except pokemondb.WebRequestException as e:
             print(f'WebRequestException in get_ev_yield call: {e}\n')
             await ctx.reply(f"{str(self.bot.user).split('#')[0]} whited out! Pokemon daycare is exhausting, so I decided not to grab egg group of {egg_group} for you.")
@@ -50,68 +85,70 @@ class PokemonDBCommands(commands.Cog):
         except pokemondb.WebSuggestionException as suggestions:
             await ctx.reply(f"Egg group {egg_group} doesn't exist. Did you mean: {suggestions}?")
         else:
-            result_str = ''
-            for i in range(len(results)):
-                if i == 0:
-                    result_str = str(results[i])
-                elif (len(result_str) + len(str(results[i])) + len(join_str)) > 2000:
-                    await ctx.reply(result_str)
-                    result_str = str(results[i])
-                else:
-                    result_str += ', ' + str(results[i])
-            await ctx.reply(result_str)
+            await self.__reply_joined(ctx, results, join_str)
 
     @commands.command("ev")
     async def ev_yield(self, ctx, pokemon: str, *args):
-        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_ev_yield, pokemon, *args)
+        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_ev_yield_async, pokemon, *args)
 
     @commands.command("types")
     async def types(self, ctx, pokemon: str, *args):
-        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_types, pokemon, *args, results_fm=lambda r: ' and '.join(r))
+        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_types_async, pokemon, *args, results_fm=lambda r: ' and '.join(r))
 
     @commands.command("evolutions")
     async def evolutions(self, ctx, pokemon: str, *args):
-        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_evolutions, pokemon, *args, results_fm=lambda r: '\n'.join(r))
+        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_evolutions_async, pokemon, *args, results_fm=lambda r: '\n'.join(r))
 
     @commands.command("forms")
     async def forms(self, ctx, pokemon: str, *args):
-        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_forms, pokemon, *args, results_fm=lambda r: '\n'.join(r))
+        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_forms_async, pokemon, *args, results_fm=lambda r: '\n'.join(r))
 
     @commands.command("egg_groups")
     async def egg_groups(self, ctx, pokemon: str, *args):
-        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_egg_groups, pokemon, *args)
+        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_egg_groups_async, pokemon, *args)
 
     @commands.command("egg_group")
     async def egg_group(self, ctx, egg_group: str, *args):
-        await self.__egg_group_lookup_cmd(ctx, pokemondb.get_egg_group_pokemon, egg_group, *args)
+        await self.__egg_group_lookup_cmd(ctx, pokemondb.get_egg_group_pokemon_async, egg_group, *args)
+
+    @commands.command("breeds_with")
+    async def breeds_with(self, ctx, pokemon: str, *args):
+        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_breeding_partners_async, pokemon, *args,
+            results_fm=lambda r: f'{pokemon} can not breed.', join_str=', ')
 
     @commands.command("abilities")
     async def abilities(self, ctx, pokemon: str, *args):
-        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_abilities, pokemon, *args, 
+        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_abilities_async, pokemon, *args, 
             results_fm=lambda r: '\n'.join([f'{r[i]}' if r[i].hidden else f'{i+1}. {r[i]}' for i in range(len(r))]))
 
     @commands.command("stats")
     async def base_stats(self, ctx, pokemon: str, *args):
-        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_base_stats, pokemon, *args, results_fm=lambda r: str(r))
+        await self.__pokemon_lookup_cmd(ctx, pokemondb.get_base_stats_async, pokemon, *args, results_fm=lambda r: str(r))
 
     @commands.command("view")
     async def view_pokemon(self, ctx, pokemon: str, *args):
-        ctx.reply("Command currently unavailable.")
-        return
         if len(args) > 0:
             await ctx.reply(f"Oh my, that's a lot of wild pokemon there. I can only lookup one at a time.")
             return
 
         try:
-            url = pokemondb.get_pokemon_image_url(pokemon)
+            image = await images.get_pokemon_image_async(pokemon)
+        except pokemondb.WebBusyException as e:
+            print(f'WebBusyException in get_pokemon_image: {e}')
+            await ctx.reply(f"The Pokemon Center is full right now! Please try {pokemon} again in a moment.")
+            return
+        except pokemondb.WebSuggestionException as suggestions:
+            await ctx.reply(f'Pokemon {pokemon} was not found in the Pokedex. Did you mean: {suggestions}?')
+            return
         except pokemondb.WebRequestException as e:
             print(f'WebRequestException in get_pokemon_image: {e}')
             await ctx.reply(f"{str(self.bot.user).split('#')[0]} whited out! Turns out {pokemon} isn't a real pokemon.")
             return
 
+        # Upload the cached bytes instead of linking the CDN, so Discord never has to fetch the image again
         embed = discord.Embed(color=0xffffff)
-        embed.set_image(url=url)
-        await ctx.reply(embed=embed)
+        embed.set_image(url=f'attachment://{image.filename}')
+        await ctx.reply(file=discord.File(io.BytesIO(image.data), filename=image.filename), embed=embed)
 
 def setup(bot):
     bot.add_cog(PokemonDBCommands(bot))
@@ -1,5 +1,6 @@
 from discord.ext import commands
 
+import scrapers
 import scrapers.thesaurus as thesaurus
 
 class ThesaurusCommands(commands.Cog):
@@ -12,31 +13,48 @@ class ThesaurusCommands(commands.Cog):
     async def on_ready(self):
         print(f'ThesaurusCommands connected as User: {self.bot.user}, ID: {self.bot.user.id}.')
 
-    @commands.command()
-    async def synonym(self, ctx, word: str, *args):
+    async def __word_list_cmd(self, ctx, lookup_fn, kind: str, word: str, *args):
         print_word = word
         if len(args) > 0:
             word_list = [word] + list(args)
             word = '+'.join(word_list)
             print_word = ' '.join(word_list)
 
-        # Get synonyms
+        # Get words
         try:
-            (sucess, results) = thesaurus.get_synonym(word)
+            (sucess, results) = await lookup_fn(word)
+        except scrapers.BusyException as e:
+            print(f'BusyException in {lookup_fn.__name__} call: {e}')
+            await ctx.send(f'Too many words in the air right now! Please ask again for {print_word} in a moment.')
+            return
         except thesaurus.WebRequestException as e:
-            print(f'WebRequestException in get_synonym call: {e}')
-            await ctx.send(f'No synonyms found for {print_word}.')
+            print(f'WebRequestException in {lookup_fn.__name__} call: {e}')
+            await ctx.send(f'No {kind} found for {print_word}.')
             return
         except thesaurus.WebParseException as e:
-            print(f'WebParseException in get_synonym call: {e}')
-            await ctx.send(f'Failed to find synonyms for {print_word}. Please contact bot tech for help.')
+            print(f'WebParseException in {lookup_fn.__name__} call: {e}')
+            await ctx.send(f'Failed to find {kind} for {print_word}. Please contact bot tech for help.')
             return
 
-        # If success is true, results are a list of synonyms. Otherwise, results is a list of word suggestions.
-        if sucess:
+        # If success is true, results are a list of words. Otherwise, results is a list of word suggestions.
+        if sucess and len(results) > 0:
             await ctx.send(', '.join(results))
+        elif sucess:
+            await ctx.send(f'No {kind} found for {print_word}.')
         else:
-            await ctx.send(f'No synonyms found for {print_word}. Did you mean: {", ".join(results)}?')
+            await ctx.send(f'No {kind} found for {print_word}. Did you mean: {", ".join(results)}?')
+
+    @commands.command()
+    async def synonym(self, ctx, word: str, *args):
+        await self.__word_list_cmd(ctx, thesaurus.get_synonym_async, 'synonyms', word, *args)
+
+    @commands.command()
+    async def antonym(self, ctx, word: str, *args):
+        await self.__word_list_cmd(ctx, thesaurus.get_antonym_async, 'antonyms', word, *args)
+
+    @commands.command()
+    async def related(self, ctx, word: str, *args):
+        await self.__word_list_cmd(ctx, thesaurus.get_related_async, 'related words', word, *args)
 
     @commands.command()
     async def define(self, ctx, word: str, *args):
@@ -45,7 +63,11 @@ class ThesaurusCommands(commands.Cog):
             return
 
         try:
-            result = thesaurus.get_definition(word)
+            result = await thesaurus.get_definition_async(word)
+        except scrapers.BusyException as e:
+            print(f'BusyException in get_definition call: {e}')
+            await ctx.send(f'Too many words in the air right now! Please ask again for {word} in a moment.')
+            return
         except thesaurus.WebRequestException as e:
             print(f'WebParseException in get_definition call: {e}')
             await ctx.send(f":bell: Ding dong that spelling is wrong :bell:")
@@ -1,3 +1,5 @@
+import os
+
 class ScraperException(Exception):
     """ Base scraper exception for all scrapers. """
     pass
@@ -6,6 +8,14 @@ class RequestException(ScraperException):
     """ Base web request exception for all scrapers. """
     pass
 
+class BusyException(RequestException):
+    """ Too many requests are queued for an upstream, so the request was dropped instead of sent. """
+    pass
+
+class NotFoundException(RequestException):
+    """ The upstream answered that a name doesn't exist, and there was nothing close enough to suggest instead. """
+    pass
+
 class ParseException(ScraperException):
     """ Base parsing error exception for all scrapers. """
     pass
@@ -15,4 +25,49 @@ class SuggestionException(ScraperException):
         self.suggestions = suggestions
 
     def __str__(self):
-        return ", ".join(self.suggestions)
\ No newline at end of file
+        return ", ".join(self.suggestions)
+
+class BatchResult:
+    """ Results of a batch lookup, in input order. Every item holds either its value or the exception raised while looking it up. """
+
+    def __init__(self, keys: list, values: list, errors: list):
+        self.keys = keys
+        self.values = values
+        self.errors = errors
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        """ Yields (key, value, error) for every input, error is None for successful lookups. """
+        return iter(zip(self.keys, self.values, self.errors))
+
+    def __getitem__(self, idx: int):
+        """ Returns the value of the input at idx, raising its exception if the lookup failed. """
+        if self.errors[idx] is not None:
+            raise self.errors[idx]
+        return self.values[idx]
+
+    def failed(self) -> list[tuple[object, Exception]]:
+        """ Returns (key, error) for every failed lookup. """
+        return [(key, error) for key, _value, error in self if error is not None]
+
+def make_key(namespace: str, args, kwargs) -> str:
+    """ Builds the cache/in-flight key of a scraper call. String arguments are case insensitive. """
+    parts = [str(arg).strip().lower() if isinstance(arg, str) else repr(arg) for arg in args]
+    parts += [f'{key}={val!r}' for key, val in sorted(kwargs.items())]
+    return f'{namespace}:{"|".join(parts)}'
+
+def get_env_int(name: str, default: int) -> int:
+    """ Reads an integer setting from the environment, returning default if it's unset or invalid. """
+    try:
+        return int(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+def get_env_float(name: str, default: float) -> float:
+    """ Reads a float setting from the environment, returning default if it's unset or invalid. """
+    try:
+        return float(os.environ[name])
+    except (KeyError, ValueError):
+        return default
@@ -0,0 +1,383 @@
+import copy
+import functools
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import scrapers
+from scrapers.executor import get_executor
+from scrapers.singleflight import get_single_flight
+
+_default_cache_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'cache.sqlite')
+_default_memory_entries = 2048
+_default_disk_bytes = 64 * 1024 * 1024
+_default_ttl = 24 * 60 * 60
+_default_stale_ttl = 7 * 24 * 60 * 60
+_default_negative_ttl = 10 * 60
+# Print the stats of every namespace after this many lookups
+_stats_report_interval = 10000
+# Seconds a disk cache query waits for another process to release the database before failing
+_disk_busy_timeout = 2.0
+# Seconds between access time updates of a disk cache entry
+_disk_access_update_interval = 60
+# Answers meaning "no such name", cached for the negative TTL
+_negative_exceptions = (scrapers.SuggestionException, scrapers.NotFoundException)
+
+class CacheStats:
+    """ Hit/miss/latency counters for one cache namespace. """
+
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.misses = 0
+        self.errors = 0
+        self.fetches = 0
+        self.fetch_time = 0.0
+        self.max_fetch_time = 0.0
+        # Counters are bumped from every scraper thread
+        self.__lock = threading.Lock()
+
+    def increment(self, counter: str):
+        with self.__lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_fetch(self, duration: float, success: bool):
+        with self.__lock:
+            self.fetches += 1
+            if not success:
+                self.errors += 1
+            self.fetch_time += duration
+            self.max_fetch_time = max(self.max_fetch_time, duration)
+
+    def to_dict(self):
+        with self.__lock:
+            hits = self.memory_hits + self.disk_hits + self.stale_hits
+            lookups = hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'stale_hits': self.stale_hits,
+                'refreshes': self.refreshes,
+                'misses': self.misses,
+                'errors': self.errors,
+                'hit_rate': hits / lookups if lookups > 0 else 0.0,
+                'avg_fetch_ms': 1000 * self.fetch_time / self.fetches if self.fetches > 0 else 0.0,
+                'max_fetch_ms': 1000 * self.max_fetch_time,
+            }
+
+    def __str__(self):
+        stats = self.to_dict()
+        return f'hits: {stats["memory_hits"]} memory / {stats["disk_hits"]} disk / {stats["stale_hits"]} stale, misses: {stats["misses"]}, errors: {stats["errors"]}, ' \
+            f'hit rate: {100 * stats["hit_rate"]:.1f}%, fetch: {stats["avg_fetch_ms"]:.1f} ms avg / {stats["max_fetch_ms"]:.1f} ms max'
+
+class MemoryCache:
+    """ Bounded in-process LRU cache with per-entry expiry. Expired entries are kept for stale_ttl seconds so they can be served stale. """
+
+    def __init__(self, max_entries: int, stale_ttl: float):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.__entries = OrderedDict() # type: OrderedDict[str, tuple[float, object]]
+        self.__lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[bool, object, float]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return (False, None, 0.0)
+            if entry[0] + self.stale_ttl < time.time():
+                del self.__entries[key]
+                return (False, None, 0.0)
+            self.__entries.move_to_end(key)
+            return (True, entry[1], entry[0])
+
+    def set(self, key: str, value, expires_at: float):
+        with self.__lock:
+            self.__entries[key] = (expires_at, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+class DiskCache:
+    """
+    Persistent SQLite cache with per-entry expiry, evicting least recently used entries once the size limit is reached.
+    Expired entries are kept for stale_ttl seconds so they can be served stale.
+    The file can be shared by several processes. The total size is kept in the database by triggers, so every process evicts against the same number,
+    and a database error (e.g. another process holding the lock past the busy timeout) makes a read a miss and skips a write instead of raising.
+    """
+
+    def __init__(self, path: str, max_bytes: int, stale_ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self.__lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.__connection = sqlite3.connect(path, timeout=_disk_busy_timeout, check_same_thread=False)
+        # Readers don't block the writer, or each other, in write-ahead log mode
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, size INTEGER, expires_at REAL, accessed_at REAL)')
+        self.__connection.execute('CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)')
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS total_size (id INTEGER PRIMARY KEY, bytes INTEGER)')
+        self.__connection.execute('INSERT OR IGNORE INTO total_size SELECT 0, COALESCE(SUM(size), 0) FROM entries')
+        self.__connection.execute('CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN UPDATE total_size SET bytes = bytes + NEW.size WHERE id = 0; END')
+        self.__connection.execute('CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN UPDATE total_size SET bytes = bytes - OLD.size WHERE id = 0; END')
+        self.__connection.execute('DELETE FROM entries WHERE expires_at < ?', (time.time() - stale_ttl,))
+        self.__connection.commit()
+
+    def get(self, key: str) -> tuple[bool, object, float]:
+        with self.__lock:
+            try:
+                row = self.__connection.execute('SELECT value, expires_at, accessed_at FROM entries WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return (False, None, 0.0)
+                now = time.time()
+                if row[1] + self.stale_ttl < now:
+                    self.__connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    self.__connection.commit()
+                    return (False, None, 0.0)
+            except sqlite3.Error as e:
+                self.__rollback()
+                print(f'Failed to read disk cache entry {key}, treating it as a miss. Error: {e}')
+                return (False, None, 0.0)
+
+            # Eviction only needs a rough LRU order, so the access time of a hot entry is written at most once per interval instead of on every hit
+            if row[2] + _disk_access_update_interval < now:
+                try:
+                    self.__connection.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+                    self.__connection.commit()
+                except sqlite3.Error as e:
+                    self.__rollback()
+                    print(f'Failed to update the access time of disk cache entry {key}. Error: {e}')
+        try:
+            return (True, pickle.loads(row[0]), row[1])
+        except Exception as e:
+            print(f'Failed to unpickle disk cache entry {key}. Error: {e}')
+            return (False, None, 0.0)
+
+    def set(self, key: str, value, expires_at: float):
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f'Failed to pickle disk cache entry {key}. Error: {e}')
+            return
+
+        with self.__lock:
+            try:
+                self.__connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self.__connection.execute('INSERT INTO entries VALUES (?, ?, ?, ?, ?)', (key, data, len(data), expires_at, time.time()))
+                if self.__get_size() > self.max_bytes:
+                    self.__evict()
+                self.__connection.commit()
+            except sqlite3.Error as e:
+                self.__rollback()
+                print(f'Failed to write disk cache entry {key}, skipping it. Error: {e}')
+
+    def clear(self):
+        with self.__lock:
+            try:
+                self.__connection.execute('DELETE FROM entries')
+                self.__connection.commit()
+            except sqlite3.Error as e:
+                self.__rollback()
+                print(f'Failed to clear disk cache {self.path}. Error: {e}')
+
+    def __rollback(self):
+        try:
+            self.__connection.rollback()
+        except sqlite3.Error:
+            pass
+
+    def __get_size(self) -> int:
+        return self.__connection.execute('SELECT bytes FROM total_size WHERE id = 0').fetchone()[0]
+
+    def __evict(self):
+        # Drop expired entries first, then the least recently used until we're back under 90% of the limit
+        self.__connection.execute('DELETE FROM entries WHERE expires_at < ?', (time.time() - self.stale_ttl,))
+        size = self.__get_size()
+        target = int(self.max_bytes * 0.9)
+        for key, entry_size in self.__connection.execute('SELECT key, size FROM entries ORDER BY accessed_at').fetchall():
+            if size <= target:
+                break
+            self.__connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+            size -= entry_size
+
+class TieredCache:
+    """ Memory LRU in front of the on-disk cache. Disk hits are promoted to memory. """
+
+    def __init__(self, memory: MemoryCache, disk: DiskCache):
+        self.memory = memory
+        self.disk = disk
+        self.stats = {} # type: dict[str, CacheStats]
+        self.lookups = 0
+        self.__stats_lock = threading.Lock()
+
+    def get_stats(self, namespace: str) -> CacheStats:
+        with self.__stats_lock:
+            if namespace not in self.stats:
+                self.stats[namespace] = CacheStats()
+            return self.stats[namespace]
+
+    def get(self, namespace: str, key: str) -> tuple[bool, object, bool]:
+        """ Returns (found, value, fresh). Found entries that are past their expiry but still within the stale window have fresh set to False. """
+        stats = self.get_stats(namespace)
+        self.__count_lookup()
+        found, value, expires_at = self.memory.get(key)
+        if found:
+            if expires_at < time.time():
+                stats.increment('stale_hits')
+                return (True, value, False)
+            stats.increment('memory_hits')
+            return (True, value, True)
+
+        if self.disk is not None:
+            found, value, expires_at = self.disk.get(key)
+            if found:
+                self.memory.set(key, value, expires_at)
+                if expires_at < time.time():
+                    stats.increment('stale_hits')
+                    return (True, value, False)
+                stats.increment('disk_hits')
+                return (True, value, True)
+
+        stats.increment('misses')
+        return (False, None, False)
+
+    def __count_lookup(self):
+        with self.__stats_lock:
+            self.lookups += 1
+            report = self.lookups % _stats_report_interval == 0
+            stats = list(self.stats.items()) if report else []
+        # Printed outside the lock, so lookups never wait on the log
+        for namespace, namespace_stats in stats:
+            print(f'Cache {namespace}: {namespace_stats}')
+
+    def set(self, key: str, value, ttl: float):
+        expires_at = time.time() + ttl
+        self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            self.disk.set(key, value, expires_at)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+_g_cache = None
+_g_cache_lock = threading.Lock()
+
+def get_cache() -> TieredCache:
+    """
+    Returns the cache shared by all scrapers, creating it on first use.
+    Configured with the SCRAPER_CACHE_PATH, SCRAPER_CACHE_MEMORY_ENTRIES, SCRAPER_CACHE_DISK_BYTES and SCRAPER_CACHE_STALE_TTL environment variables.
+    """
+    global _g_cache
+    if _g_cache is None:
+        with _g_cache_lock:
+            if _g_cache is None:
+                stale_ttl = scrapers.get_env_int('SCRAPER_CACHE_STALE_TTL', _default_stale_ttl)
+                memory = MemoryCache(scrapers.get_env_int('SCRAPER_CACHE_MEMORY_ENTRIES', _default_memory_entries), stale_ttl)
+                path = os.environ.get('SCRAPER_CACHE_PATH', _default_cache_path)
+                try:
+                    disk = DiskCache(path, scrapers.get_env_int('SCRAPER_CACHE_DISK_BYTES', _default_disk_bytes), stale_ttl)
+                except (sqlite3.Error, OSError) as e:
+                    print(f'Failed to open disk cache {path}, using the memory cache only. Error: {e}')
+                    disk = None
+                _g_cache = TieredCache(memory, disk)
+    return _g_cache
+
+def get_stats() -> dict[str, dict]:
+    """ Returns the hit/miss/latency counters of every cache namespace. """
+    return {namespace: stats.to_dict() for namespace, stats in get_cache().stats.items()}
+
+class _CachedMiss:
+    """ A cached "not found" answer, holding the suggestion or not found exception to raise on a hit. """
+
+    def __init__(self, exception: Exception):
+        self.exception = exception
+
+def _unwrap(value):
+    if isinstance(value, _CachedMiss):
+        # Raise a copy, re-raising the cached instance would keep growing its traceback
+        raise copy.copy(value.exception)
+    return value
+
+def is_cached(fn, *args, **kwargs) -> bool:
+    """ Returns True if a call of a cached scraper function would be answered from the cache, including stale and negative entries. """
+    cache = get_cache()
+    key = scrapers.make_key(fn.cache_namespace, args, kwargs)
+    return cache.memory.get(key)[0] or (cache.disk is not None and cache.disk.get(key)[0])
+
+_g_refreshing = set() # type: set[str]
+_g_refreshing_lock = threading.Lock()
+
+def _refresh_in_background(key: str, fetch, stats: CacheStats):
+    # At most one refresh per key is queued, later stale hits just serve the stale value
+    with _g_refreshing_lock:
+        if key in _g_refreshing:
+            return
+        _g_refreshing.add(key)
+
+    def refresh():
+        try:
+            get_single_flight().do(key, fetch)
+            stats.increment('refreshes')
+        except _negative_exceptions:
+            # Still unknown, the fetch cached the new miss
+            stats.increment('refreshes')
+        except Exception as e:
+            print(f'Failed to refresh stale cache entry {key}. Error: {e}')
+        finally:
+            with _g_refreshing_lock:
+                _g_refreshing.discard(key)
+    get_executor().submit(refresh)
+
+def cached(namespace: str, ttl: float = None):
+    """
+    Decorator caching the results of a scraper function in the shared two tier cache.
+    String arguments are case insensitive. Exceptions are not cached. Concurrent misses for the same key share one call.
+    Expired entries are served stale while they are refreshed in the background, so an outage upstream doesn't reach the caller.
+    Suggestion and not found exceptions (unknown names) are cached too, for SCRAPER_CACHE_NEGATIVE_TTL seconds, so repeated typos don't reach the upstream.
+
+        Parameters:
+            namespace (str): Name of the cache namespace, used as the key prefix and for the stats
+            ttl (float): Lifetime of an entry in seconds. Defaults to the SCRAPER_CACHE_TTL environment variable, or one day.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            key = scrapers.make_key(namespace, args, kwargs)
+            found, value, fresh = cache.get(namespace, key)
+
+            def fetch():
+                stats = cache.get_stats(namespace)
+                start = time.perf_counter()
+                try:
+                    value = fn(*args, **kwargs)
+                except _negative_exceptions as e:
+                    stats.record_fetch(time.perf_counter() - start, True)
+                    cache.set(key, _CachedMiss(e), scrapers.get_env_int('SCRAPER_CACHE_NEGATIVE_TTL', _default_negative_ttl))
+                    raise
+                except Exception:
+                    stats.record_fetch(time.perf_counter() - start, False)
+                    raise
+                stats.record_fetch(time.perf_counter() - start, True)
+                cache.set(key, value, ttl if ttl is not None else scrapers.get_env_int('SCRAPER_CACHE_TTL', _default_ttl))
+                return value
+
+            if found:
+                if not fresh:
+                    _refresh_in_background(key, fetch, cache.get_stats(namespace))
+                return _unwrap(value)
+            return get_single_flight().do(key, fetch)
+        wrapper.cache_namespace = namespace
+        return wrapper
+    return decorator
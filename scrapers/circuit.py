@@ -0,0 +1,103 @@
+import threading
+import time
+
+import requests
+
+import scrapers
+
+_default_failure_threshold = 5
+_default_reset_timeout = 30.0
+
+class CircuitOpenException(scrapers.BusyException):
+    """ The upstream failed repeatedly, so requests to it fail fast until the breaker's reset timeout has passed. """
+    pass
+
+def is_outage(e: Exception) -> bool:
+    """ Returns True if an exception means the upstream is unhealthy, rather than the request being bad or shed locally. """
+    if isinstance(e, (scrapers.BusyException, scrapers.SuggestionException, scrapers.NotFoundException, scrapers.ParseException)):
+        return False
+    if isinstance(e, requests.exceptions.HTTPError) and e.response is not None:
+        return e.response.status_code >= 500 or e.response.status_code == 429
+    return True
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures of one upstream. After failure_threshold failures in a row the breaker opens and every call fails fast.
+    Once reset_timeout seconds have passed a single trial call is let through: success closes the breaker, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self.__opened_at = 0.0
+        self.__lock = threading.Lock()
+
+    def before(self) -> bool:
+        """
+        Call before sending a request to the upstream.
+
+            Returns:
+                probe (bool): True if this call is the half open trial call, to be passed on to release
+
+            Exceptions:
+                Throws:
+                    - CircuitOpenException if the breaker is open, or half open with a trial call already in flight
+        """
+        with self.__lock:
+            if self.state == CircuitBreaker.CLOSED:
+                return False
+            if self.state == CircuitBreaker.OPEN and time.monotonic() - self.__opened_at >= self.reset_timeout:
+                self.state = CircuitBreaker.HALF_OPEN
+                return True
+            self.rejected += 1
+        raise CircuitOpenException(f'{self.name} is failing, not sending requests to it for up to {self.reset_timeout} seconds.')
+
+    def record(self, success: bool):
+        """ Call with the outcome of every request let through by before. """
+        with self.__lock:
+            if success:
+                if self.state != CircuitBreaker.CLOSED:
+                    print(f'Circuit breaker for {self.name} closed.')
+                self.state = CircuitBreaker.CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == CircuitBreaker.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != CircuitBreaker.OPEN:
+                    print(f'Circuit breaker for {self.name} opened after {self.failures} failures.')
+                self.state = CircuitBreaker.OPEN
+                self.__opened_at = time.monotonic()
+
+    def release(self, probe: bool):
+        """ Call instead of record when a request let through by before was never sent, e.g. it was shed locally. A trial call gives up its slot. """
+        with self.__lock:
+            if probe and self.state == CircuitBreaker.HALF_OPEN:
+                # Still past the reset timeout, so the next call becomes the trial call
+                self.state = CircuitBreaker.OPEN
+
+_g_breakers = {} # type: dict[str, CircuitBreaker]
+_g_breakers_lock = threading.Lock()
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    Returns the circuit breaker of an upstream, creating it on first use.
+    Configured with the SCRAPER_BREAKER_FAILURES and SCRAPER_BREAKER_RESET_TIMEOUT (seconds) environment variables.
+    """
+    breaker = _g_breakers.get(name)
+    if breaker is None:
+        with _g_breakers_lock:
+            breaker = _g_breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name,
+                    int(scrapers.get_env_float('SCRAPER_BREAKER_FAILURES', _default_failure_threshold)),
+                    scrapers.get_env_float('SCRAPER_BREAKER_RESET_TIMEOUT', _default_reset_timeout))
+                _g_breakers[name] = breaker
+    return breaker
@@ -0,0 +1,184 @@
+import argparse
+import os
+import sqlite3
+import threading
+
+import scrapers
+
+DICTIONARY_VERSION = 1
+
+_default_dictionary_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'dictionary.sqlite')
+
+# WordNet file suffixes and the part of speech names PyDictionary answers with, in the order definitions are listed
+_parts_of_speech = [
+    ('noun', 'Noun'),
+    ('verb', 'Verb'),
+    ('adj', 'Adjective'),
+    ('adv', 'Adverb'),
+]
+
+# WordNet's morphy detachment rules, used for inflected words that aren't in the exception lists
+_detachment_rules = {
+    'Noun': [('s', ''), ('ses', 's'), ('xes', 'x'), ('zes', 'z'), ('ches', 'ch'), ('shes', 'sh'), ('men', 'man'), ('ies', 'y')],
+    'Verb': [('s', ''), ('ies', 'y'), ('es', 'e'), ('es', ''), ('ed', 'e'), ('ed', ''), ('ing', 'e'), ('ing', '')],
+    'Adjective': [('er', ''), ('est', ''), ('er', 'e'), ('est', 'e')],
+    'Adverb': [],
+}
+
+class DictionaryException(scrapers.ScraperException):
+    """ Base exception class for this module. """
+    pass
+
+def _normalize_word(word: str) -> str:
+    return '_'.join(word.strip().lower().split())
+
+class LocalDictionary:
+    """ Read-only view of a dictionary file built from WordNet. Every lookup is an indexed SQLite read. """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__lock = threading.Lock()
+        try:
+            self.__connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+            meta = dict(self.__connection.execute('SELECT key, value FROM meta'))
+        except sqlite3.Error as e:
+            raise DictionaryException(f'Failed to open dictionary {path}. Error: {e}')
+        if int(meta.get('version', 0)) != DICTIONARY_VERSION:
+            raise DictionaryException(f'Dictionary {path} has version {meta.get("version")}, expected {DICTIONARY_VERSION}.')
+
+    def __query(self, sql: str, args: tuple) -> list[tuple]:
+        with self.__lock:
+            return self.__connection.execute(sql, args).fetchall()
+
+    def __lemmas(self, word: str, pos: str) -> list[str]:
+        # The word itself, its irregular forms ("geese" -> "goose") and its regular inflections ("running" -> "run")
+        lemmas = [word]
+        lemmas += [lemma for (lemma,) in self.__query('SELECT lemma FROM exceptions WHERE form = ? AND pos = ?', (word, pos))]
+        lemmas += [word[:-len(suffix)] + ending for suffix, ending in _detachment_rules[pos] if word.endswith(suffix) and len(word) > len(suffix)]
+        return list(dict.fromkeys(lemmas))
+
+    def meaning(self, word: str) -> dict[str, list[str]]:
+        """
+        Looks up the definitions of a word, grouped by part of speech, most common sense first.
+
+            Parameters:
+                word (str): The word to define, inflected forms are looked up by their base form
+
+            Returns:
+                meaning (dict[str, list[str]]): Definitions keyed by 'Noun', 'Verb', 'Adjective' and 'Adverb', or None if the word isn't known
+        """
+        word = _normalize_word(word)
+        meaning = {}
+        for _suffix, pos in _parts_of_speech:
+            for lemma in self.__lemmas(word, pos):
+                rows = self.__query('SELECT definition FROM definitions WHERE word = ? AND pos = ? ORDER BY sense', (lemma, pos))
+                if rows:
+                    meaning[pos] = [definition for (definition,) in rows]
+                    break
+        return meaning if meaning else None
+
+_g_dictionary = None
+_g_dictionary_loaded = False
+_g_dictionary_lock = threading.Lock()
+
+def get_dictionary() -> LocalDictionary:
+    """
+    Returns the local dictionary, opening it on first use.
+    The path is read from the SCRAPER_DICTIONARY_PATH environment variable, falling back to scrapers/data/dictionary.sqlite.
+
+        Returns:
+            dictionary (LocalDictionary): The opened dictionary, or None if no usable dictionary exists
+    """
+    global _g_dictionary, _g_dictionary_loaded
+    if not _g_dictionary_loaded:
+        with _g_dictionary_lock:
+            if not _g_dictionary_loaded:
+                path = os.environ.get('SCRAPER_DICTIONARY_PATH', _default_dictionary_path)
+                if os.path.isfile(path):
+                    try:
+                        _g_dictionary = LocalDictionary(path)
+                        print(f'Opened local dictionary {path}.')
+                    except DictionaryException as e:
+                        print(f'Failed to open local dictionary. Error: {e}')
+                else:
+                    print(f'No local dictionary found at {path}. All definitions will use the network.')
+                _g_dictionary_loaded = True
+    return _g_dictionary
+
+def _read_glosses(wordnet_dir: str, suffix: str) -> dict[str, str]:
+    # data.<pos> lines: offset lex_filenum ss_type w_cnt word lex_id ... | gloss; "example"; "example"
+    glosses = {}
+    with open(os.path.join(wordnet_dir, f'data.{suffix}'), encoding='utf-8', errors='replace') as data_file:
+        for line in data_file:
+            if line.startswith(' ') or '|' not in line:
+                continue
+            offset = line.split(' ', 1)[0]
+            gloss = line.split('|', 1)[1].strip()
+            glosses[offset] = gloss.split('; "', 1)[0].strip()
+    return glosses
+
+def _read_senses(wordnet_dir: str, suffix: str) -> dict[str, list[str]]:
+    # index.<pos> lines: lemma pos synset_cnt p_cnt [ptr_symbol...] sense_cnt tagsense_cnt synset_offset..., most common sense first
+    senses = {}
+    with open(os.path.join(wordnet_dir, f'index.{suffix}'), encoding='utf-8', errors='replace') as index_file:
+        for line in index_file:
+            if line.startswith(' '):
+                continue
+            fields = line.split()
+            synset_cnt, p_cnt = int(fields[2]), int(fields[3])
+            senses[fields[0]] = fields[6 + p_cnt:6 + p_cnt + synset_cnt]
+    return senses
+
+def _read_exceptions(wordnet_dir: str, suffix: str) -> list[tuple[str, str]]:
+    path = os.path.join(wordnet_dir, f'{suffix}.exc')
+    if not os.path.isfile(path):
+        return []
+    exceptions = []
+    with open(path, encoding='utf-8', errors='replace') as exc_file:
+        for line in exc_file:
+            fields = line.split()
+            exceptions += [(fields[0], lemma) for lemma in fields[1:]]
+    return exceptions
+
+def build_dictionary(wordnet_dir: str, path: str):
+    """
+    Builds a dictionary file from the WordNet database files (the dict directory of a WordNet 3.x release).
+
+        Parameters:
+            wordnet_dir (str): Directory containing the data.*, index.* and *.exc files
+            path (str): Output path of the dictionary file. Any existing file is replaced.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.executescript('''
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE definitions (word TEXT, pos TEXT, sense INTEGER, definition TEXT, PRIMARY KEY (word, pos, sense)) WITHOUT ROWID;
+            CREATE TABLE exceptions (form TEXT, pos TEXT, lemma TEXT);
+            CREATE INDEX exceptions_form ON exceptions (form, pos);
+        ''')
+        connection.executemany('INSERT INTO meta VALUES (?, ?)', [('version', str(DICTIONARY_VERSION)), ('source', os.path.abspath(wordnet_dir))])
+        for suffix, pos in _parts_of_speech:
+            glosses = _read_glosses(wordnet_dir, suffix)
+            connection.executemany('INSERT INTO definitions VALUES (?, ?, ?, ?)', [
+                (lemma, pos, sense, glosses[offset])
+                for lemma, offsets in _read_senses(wordnet_dir, suffix).items()
+                for sense, offset in enumerate(offsets) if offset in glosses
+            ])
+            connection.executemany('INSERT INTO exceptions VALUES (?, ?, ?)', [(form, pos, lemma) for form, lemma in _read_exceptions(wordnet_dir, suffix)])
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, path)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build a local dictionary from the WordNet database files.')
+    parser.add_argument('wordnet_dir', help='Directory containing the WordNet data.*, index.* and *.exc files.')
+    parser.add_argument('output', nargs='?', default=os.environ.get('SCRAPER_DICTIONARY_PATH', _default_dictionary_path),
+        help='Output path of the dictionary file.')
+    args = parser.parse_args()
+    build_dictionary(args.wordnet_dir, args.output)
+    print(f'Wrote dictionary to {args.output}.')
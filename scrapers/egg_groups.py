@@ -0,0 +1,62 @@
+import threading
+
+from scrapers.snapshot import PokedexSnapshot, get_snapshot
+
+NO_EGGS_GROUP = 'no-eggs'
+DITTO_GROUP = 'ditto'
+
+class EggGroupIndex:
+    """
+    Inverted index from egg group to species, plus an egg group bitmask per species.
+    Two species can breed when their masks intersect, so compatibility checks are a single AND.
+    """
+
+    def __init__(self, snapshot: PokedexSnapshot):
+        self.__snapshot = snapshot
+        self.members = snapshot.egg_groups
+        self.group_bits = {group: 1 << i for i, group in enumerate(sorted(self.members))} # type: dict[str, int]
+        self.species_masks = {} # type: dict[str, int]
+        for species in snapshot.species.values():
+            mask = 0
+            for group in species.egg_groups:
+                mask |= self.group_bits[group]
+            self.species_masks[species.name] = mask
+        self.__no_eggs_bit = self.group_bits.get(NO_EGGS_GROUP, 0)
+        self.__ditto_bit = self.group_bits.get(DITTO_GROUP, 0)
+
+    def get_members(self, egg_group: str) -> list[str]:
+        """ Returns the species in the egg group in national dex order, or None if the group isn't known. """
+        return self.__snapshot.find_egg_group(egg_group)
+
+    def get_breeding_partners(self, name: str) -> list[str]:
+        """
+        Returns every species that can breed with the input pokemon, or None if it isn't known.
+        Species sharing an egg group are compatible, Ditto is compatible with everyone that can breed, and the no eggs group breeds with nobody.
+        """
+        species = self.__snapshot.find_species(name)
+        if species is None:
+            return None
+        mask = self.species_masks[species.name]
+        if mask == 0 or mask & self.__no_eggs_bit:
+            return []
+        if mask & self.__ditto_bit:
+            # Ditto breeds with everything but the no eggs group and other Ditto
+            excluded = self.__no_eggs_bit | self.__ditto_bit
+            return [other for other, other_mask in self.species_masks.items() if other_mask and not other_mask & excluded]
+        return [other for other, other_mask in self.species_masks.items() if other_mask & (mask | self.__ditto_bit)]
+
+_g_index = None
+_g_index_loaded = False
+_g_index_lock = threading.Lock()
+
+def get_egg_group_index() -> EggGroupIndex:
+    """ Returns the egg group index built from the Pokedex snapshot, or None if there is no snapshot. """
+    global _g_index, _g_index_loaded
+    if not _g_index_loaded:
+        with _g_index_lock:
+            if not _g_index_loaded:
+                snapshot = get_snapshot()
+                if snapshot is not None:
+                    _g_index = EggGroupIndex(snapshot)
+                _g_index_loaded = True
+    return _g_index
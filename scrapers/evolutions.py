@@ -0,0 +1,49 @@
+import threading
+
+from scrapers.snapshot import PokedexSnapshot, get_snapshot
+
+class EvolutionGraph:
+    """ Precomputed evolution chains of every species in the Pokedex snapshot. """
+
+    def __init__(self, snapshot: PokedexSnapshot):
+        self.chains = {} # type: dict[int, list[str]]
+        self.chain_ids = {} # type: dict[str, int]
+        self.__snapshot = snapshot
+
+        for chain_id, chain in snapshot.evolution_chains.items():
+            self.chains[chain_id] = chain
+            for species in chain:
+                self.chain_ids[species] = chain_id
+
+    def __get_species_name(self, name: str) -> str:
+        species = self.__snapshot.find_species(name)
+        return species.name if species is not None and species.name in self.chain_ids else None
+
+    def get_chain(self, name: str) -> list[str]:
+        """ Returns every species in the evolution chain of name, base species first, or None if name isn't known. """
+        species = self.__get_species_name(name)
+        return self.chains[self.chain_ids[species]] if species is not None else None
+
+    def is_evolution_of(self, name: str, other: str) -> bool:
+        """ Returns True if both pokemon are in the same evolution chain, or None if either isn't known. """
+        species = self.__get_species_name(name)
+        other_species = self.__get_species_name(other)
+        if species is None or other_species is None:
+            return None
+        return self.chain_ids[species] == self.chain_ids[other_species]
+
+_g_graph = None
+_g_graph_loaded = False
+_g_graph_lock = threading.Lock()
+
+def get_evolution_graph() -> EvolutionGraph:
+    """ Returns the evolution graph built from the Pokedex snapshot, or None if there is no snapshot. """
+    global _g_graph, _g_graph_loaded
+    if not _g_graph_loaded:
+        with _g_graph_lock:
+            if not _g_graph_loaded:
+                snapshot = get_snapshot()
+                if snapshot is not None:
+                    _g_graph = EvolutionGraph(snapshot)
+                _g_graph_loaded = True
+    return _g_graph
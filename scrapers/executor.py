@@ -0,0 +1,114 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import scrapers
+
+_default_max_workers = 8
+_default_fan_out_workers = 8
+
+_g_executor = None
+_g_fan_out_executor = None
+_g_executor_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the bounded thread pool shared by all blocking scraper calls, creating it on first use.
+    The pool size is read from the SCRAPER_MAX_WORKERS environment variable.
+    """
+    global _g_executor
+    if _g_executor is None:
+        with _g_executor_lock:
+            if _g_executor is None:
+                _g_executor = ThreadPoolExecutor(max_workers=scrapers.get_env_int('SCRAPER_MAX_WORKERS', _default_max_workers), thread_name_prefix='scraper')
+    return _g_executor
+
+def get_fan_out_executor() -> ThreadPoolExecutor:
+    """
+    Returns the thread pool used to fetch several records concurrently from within a scraper call.
+    It is separate from the main pool so a scraper running on the main pool can never wait on itself.
+    The pool size is read from the SCRAPER_FAN_OUT_WORKERS environment variable.
+    """
+    global _g_fan_out_executor
+    if _g_fan_out_executor is None:
+        with _g_executor_lock:
+            if _g_fan_out_executor is None:
+                _g_fan_out_executor = ThreadPoolExecutor(max_workers=scrapers.get_env_int('SCRAPER_FAN_OUT_WORKERS', _default_fan_out_workers),
+                    thread_name_prefix='scraper-fan-out')
+    return _g_fan_out_executor
+
+def _call_catching(fn, item):
+    try:
+        return fn(item)
+    except Exception as e:
+        return e
+
+def map_concurrent(fn, items: list, return_exceptions: bool = False) -> list:
+    """
+    Calls fn on every item concurrently on the fan out pool.
+
+        Parameters:
+            fn: The blocking function to call with each item
+            items (list): The inputs
+            return_exceptions (bool): Return exceptions raised by fn in place of their results instead of raising them
+
+        Returns:
+            results (list): The return values, in input order. Unless return_exceptions is set, the first exception raised by any call is raised instead.
+    """
+    if return_exceptions:
+        fn = functools.partial(_call_catching, fn)
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    futures = [get_fan_out_executor().submit(fn, item) for item in items]
+    return [future.result() for future in futures]
+
+def map_batch(fn, keys: list, is_local=None) -> scrapers.BatchResult:
+    """
+    Looks up many keys with a single key scraper function. Duplicate keys (case insensitive) are looked up once.
+    Keys is_local returns True for (e.g. cache hits) are resolved inline, the rest are fetched concurrently on the fan out pool,
+    so fn must not fan out on that pool itself.
+
+        Parameters:
+            fn: The blocking single key lookup
+            keys (list): The keys to look up
+            is_local: Optional predicate telling which keys can be answered without a network call
+
+        Returns:
+            results (scrapers.BatchResult): One value or exception per key, in input order
+    """
+    ids = [scrapers.make_key('batch', (key,), {}) for key in keys]
+    unique = {} # type: dict[str, object]
+    for key_id, key in zip(ids, keys):
+        unique.setdefault(key_id, key)
+    local = {key_id for key_id, key in unique.items() if is_local is not None and is_local(key)}
+    remote = [key_id for key_id in unique if key_id not in local]
+
+    outcomes = {key_id: _call_catching(fn, unique[key_id]) for key_id in local}
+    outcomes.update(zip(remote, map_concurrent(fn, [unique[key_id] for key_id in remote], return_exceptions=True)))
+
+    values = [None if isinstance(outcomes[key_id], Exception) else outcomes[key_id] for key_id in ids]
+    errors = [outcomes[key_id] if isinstance(outcomes[key_id], Exception) else None for key_id in ids]
+    return scrapers.BatchResult(list(keys), values, errors)
+
+async def run(fn, *args, **kwargs):
+    """
+    Runs a blocking scraper function on the shared thread pool so the event loop stays responsive.
+    Exceptions raised by the function are raised from the await.
+
+        Parameters:
+            fn: The blocking function to call
+            *args, **kwargs: Arguments passed to the function
+
+        Returns:
+            The return value of the function
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+
+def awaitable(fn):
+    """ Wraps a blocking scraper function into a coroutine function that runs it on the shared thread pool. """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run(fn, *args, **kwargs)
+    return wrapper
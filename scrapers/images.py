@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+
+import requests
+
+import scrapers
+import scrapers.pokedex
+import scrapers.session
+from scrapers.cache import DiskCache
+from scrapers.executor import awaitable
+
+_default_image_cache_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'images.sqlite')
+_default_image_cache_bytes = 32 * 1024 * 1024
+_default_image_ttl = 30 * 24 * 60 * 60
+# Expired images are kept until the size limit evicts them, they are revalidated with a conditional GET instead of downloaded again
+_image_stale_ttl = 10 * 365 * 24 * 60 * 60
+
+class ImageScraperException(scrapers.ScraperException):
+    """ Base exception class for this module. """
+    pass
+
+class WebRequestException(ImageScraperException, scrapers.RequestException):
+    """ A web request error occurred. Inherits from ImageScraperException. """
+    pass
+
+class CachedImage:
+    """ Image bytes plus the validators needed to revalidate them with the CDN. """
+
+    def __init__(self, url: str, data: bytes, etag: str, last_modified: str):
+        self.url = url
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def filename(self) -> str:
+        return self.url.rsplit('/', 1)[-1]
+
+_g_image_cache = None
+_g_image_cache_loaded = False
+_g_image_cache_lock = threading.Lock()
+
+def get_image_cache() -> DiskCache:
+    """
+    Returns the on-disk LRU cache of downloaded artwork, or None if it can't be opened.
+    Configured with the SCRAPER_IMAGE_CACHE_PATH and SCRAPER_IMAGE_CACHE_BYTES environment variables.
+    """
+    global _g_image_cache, _g_image_cache_loaded
+    if not _g_image_cache_loaded:
+        with _g_image_cache_lock:
+            if not _g_image_cache_loaded:
+                path = os.environ.get('SCRAPER_IMAGE_CACHE_PATH', _default_image_cache_path)
+                try:
+                    _g_image_cache = DiskCache(path, scrapers.get_env_int('SCRAPER_IMAGE_CACHE_BYTES', _default_image_cache_bytes), _image_stale_ttl)
+                except Exception as e:
+                    print(f'Failed to open image cache {path}, images will be downloaded every time. Error: {e}')
+                _g_image_cache_loaded = True
+    return _g_image_cache
+
+def _download(url: str, cached_image: CachedImage) -> CachedImage:
+    headers = {}
+    if cached_image is not None:
+        if cached_image.etag is not None:
+            headers['If-None-Match'] = cached_image.etag
+        if cached_image.last_modified is not None:
+            headers['If-Modified-Since'] = cached_image.last_modified
+    try:
+        response = scrapers.session.get(url, headers=headers)
+        if response.status_code == 304 and cached_image is not None:
+            return cached_image
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        raise WebRequestException(f'Failed to GET request to URL {url}. Error: {e}')
+    return CachedImage(url, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+def get_pokemon_image(pokemon: str) -> CachedImage:
+    """
+    Looks up the official artwork of a pokemon, downloading it only if it isn't in the local image cache.
+    An image that isn't cached is fetched with a single GET, with no separate existence check.
+    Expired images are revalidated with a conditional GET, and a 304 Not Modified keeps the cached copy fresh for another TTL.
+
+        Parameters:
+            pokemon (str): A pokemon to lookup the artwork of
+
+        Returns:
+            image (CachedImage): The image bytes and the URL they came from
+
+        Exceptions:
+            Throws:
+                - WebRequestException
+                - scrapers.RequestException
+                - scrapers.SuggestionException
+    """
+    cache = get_image_cache()
+    key = scrapers.make_key('images.artwork', (pokemon,), {})
+    found, cached_image, expires_at = cache.get(key) if cache is not None else (False, None, 0.0)
+    if found and expires_at >= time.time():
+        return cached_image
+
+    # The GET doubles as the existence check, a name the CDN doesn't know fails the download
+    url = cached_image.url if found else scrapers.pokedex.get_pokemon_artwork_url(pokemon)
+    try:
+        image = _download(url, cached_image)
+    except scrapers.RequestException as e:
+        if not found:
+            raise
+        # The CDN is unreachable, the expired copy is still the right picture
+        print(f'Failed to revalidate cached image {url}, serving the cached copy. Error: {e}')
+        return cached_image
+    if cache is not None:
+        cache.set(key, image, time.time() + scrapers.get_env_int('SCRAPER_IMAGE_CACHE_TTL', _default_image_ttl))
+    return image
+
+# Awaitable version of the lookup, run on the shared scraper thread pool
+get_pokemon_image_async = awaitable(get_pokemon_image)
@@ -1,10 +1,35 @@
 from utility.pokemon import PokemonStats
-from data.pokemon_list import all_pokemon
-from data.egg_group_list import all_egg_groups
-from difflib import get_close_matches
 import pokebase
+import requests
 
 import scrapers
+from scrapers.executor import awaitable, map_concurrent
+from scrapers.cache import cached
+from scrapers.snapshot import get_snapshot, egg_group_aliases
+from data.egg_group_list import all_egg_groups
+from scrapers.evolutions import get_evolution_graph
+from scrapers.egg_groups import get_egg_group_index
+from scrapers.suggestions import suggest_pokemon, suggest_egg_group, screen_pokemon, screen_egg_group
+import scrapers.session
+from pokebase.common import api_url_build
+
+def _call_api(endpoint, resource_id=None, subresource=None):
+    # pokebase.api._call_api, sent on the shared session instead of a bare requests.get without a timeout
+    url = api_url_build(endpoint, resource_id, subresource)
+    response = scrapers.session.get(url)
+    response.raise_for_status()
+    data = response.json()
+
+    # Endpoint lists are paged, ask again for all of them
+    if resource_id is None and data['count'] != len(data['results']):
+        response = scrapers.session.get(url, params={'limit': data['count']})
+        response.raise_for_status()
+        data = response.json()
+    return data
+
+# The pokebase library sends its requests from api._call_api, including the lazy loads of nested resources,
+# so replacing it gives every request to PokeAPI the session's timeouts, retries, rate limit and circuit breaker
+pokebase.api._call_api = _call_api
 
 class PokemonDBScraperException(scrapers.ScraperException):
     """ Base exception class for this module. """
@@ -23,6 +48,10 @@ class WebSuggestionException(PokemonDBScraperException, scrapers.SuggestionExcep
     def __init__(self, *args):
         scrapers.SuggestionException.__init__(self, *args)
 
+class WebNotFoundException(WebRequestException, scrapers.NotFoundException):
+    """ PokeAPI doesn't have the name, and there are no similar names to suggest. Inherits from WebRequestException and scrapers.NotFoundException. """
+    pass
+
 class Ability:
     def __init__(self, name: str, description: str, hidden: bool):
         self.name = name
@@ -36,27 +65,49 @@ class Ability:
             self.description
         )
 
-def _pokebase_lookup(key: str, lookup_fn, suggestion_list: list[str]):
-    info = lookup_fn(key)
+def _pokebase_lookup(key: str, lookup_fn, suggest_fn, screen_fn):
+    # Names that look like a typo of a known name are answered locally, without asking PokeAPI
+    suggestions = screen_fn(key)
+    if suggestions is not None:
+        raise WebSuggestionException(suggestions)
+    try:
+        info = lookup_fn(key)
+    except requests.exceptions.HTTPError as e:
+        if e.response is None or e.response.status_code != 404:
+            raise WebRequestException(f'Failed to lookup {key} from PokeAPI. Error: {e}')
+        info = None
+    except requests.exceptions.RequestException as e:
+        raise WebRequestException(f'Failed to lookup {key} from PokeAPI. Error: {e}')
+
+    # Unknown names are answered with a 404, or with the endpoint's resource list by pokebase. Both are cached as misses.
     if not hasattr(info, 'id'):
-        matches = get_close_matches(key, suggestion_list)
+        matches = suggest_fn(key)
         if len(matches) > 0:
             raise WebSuggestionException(matches)
-        return None
+        raise WebNotFoundException(f'{key} was not found in PokeAPI.')
     return info
 
 def _get_pokemon_lookup(pokemon: str, lookup_fn):
-    pokemon_info = _pokebase_lookup(pokemon.lower(), lookup_fn, all_pokemon)
-    if pokemon_info is None:
-        raise WebRequestException(f'Failed to find pokemon {pokemon}.')
-    return pokemon_info
+    return _pokebase_lookup(pokemon.lower(), lookup_fn, suggest_pokemon, screen_pokemon)
 
 def _get_egg_group_lookup(egg_group: str, lookup_fn):
-    egg_group_info = _pokebase_lookup(egg_group.lower(), lookup_fn, all_egg_groups)
-    if egg_group_info is None:
-        raise WebRequestException(f'Failed to find egg group {egg_group}.')
-    return egg_group_info
-
+    return _pokebase_lookup(egg_group.lower(), lookup_fn, suggest_egg_group, screen_egg_group)
+
+@cached('pokebase.ability_description')
+def _get_ability_description(ability: str) -> str:
+    # Ability descriptions are shared by many species, so they're cached on their own
+    snapshot = get_snapshot()
+    description = snapshot.find_ability_description(ability) if snapshot is not None else None
+    if description is not None:
+        return description
+
+    poke_ability = pokebase.ability(ability)
+    for entry in poke_ability.effect_entries:
+        if entry.language.name == "en":
+            return entry.short_effect
+    return ""
+
+@cached('pokebase.ev_yield_as_stats')
 def get_ev_yield_as_stats(pokemon: str) -> PokemonStats:
     """
     Looks up the EV yield of a pokemon using PokeBase library. 
@@ -73,9 +124,15 @@ def get_ev_yield_as_stats(pokemon: str) -> PokemonStats:
                 - WebRequestException
                 - WebSuggestionException
     """
+    snapshot = get_snapshot()
+    record = snapshot.find_pokemon(pokemon) if snapshot is not None else None
+    if record is not None:
+        return PokemonStats(*record.ev_yield)
+
     pokemon_info = _get_pokemon_lookup(pokemon, pokebase.pokemon)
     return PokemonStats(*(int(pokemon_info.stats[i].effort) for i in range(6)))
 
+@cached('pokebase.ev_yield')
 def get_ev_yield(pokemon: str) -> list[str]:
     """
     Looks up the EV yield of a pokemon using https://pokemondb.net/pokedex/. 
@@ -96,6 +153,7 @@ def get_ev_yield(pokemon: str) -> list[str]:
     evs = get_ev_yield_as_stats(pokemon).to_pretty_dict()
     return [f'{val} {key}' for key, val in evs.items() if val != 0]
 
+@cached('pokebase.types')
 def get_types(pokemon: str) -> list[str]:
     """
     Looks up the type(s) of a pokemon using https://pokemondb.net/pokedex/. 
@@ -114,9 +172,15 @@ def get_types(pokemon: str) -> list[str]:
                 - WebRequestException
                 - WebParseException
     """
+    snapshot = get_snapshot()
+    record = snapshot.find_pokemon(pokemon) if snapshot is not None else None
+    if record is not None:
+        return [poke_type.capitalize() for poke_type in record.types]
+
     pokemon_info = _get_pokemon_lookup(pokemon, pokebase.pokemon)
     return [poke_type.type.name.capitalize() for poke_type in pokemon_info.types]
 
+@cached('pokebase.egg_groups')
 def get_egg_groups(pokemon: str) -> list[str]:
     """
     Looks up the egg group(s) of a pokemon using https://pokemondb.net/pokedex/. 
@@ -135,9 +199,15 @@ def get_egg_groups(pokemon: str) -> list[str]:
                 - WebRequestException
                 - WebParseException
     """
+    snapshot = get_snapshot()
+    species = snapshot.find_species(pokemon) if snapshot is not None else None
+    if species is not None:
+        return [egg_group.capitalize() for egg_group in species.egg_groups]
+
     pokemon_species = _get_pokemon_lookup(pokemon, pokebase.pokemon_species)
     return [egg_group.name.capitalize() for egg_group in pokemon_species.egg_groups]
 
+@cached('pokebase.abilities')
 def get_abilities(pokemon: str) -> list[Ability]:
     """
     Looks up the abilities of a pokemon using https://pokemondb.net/pokedex/. 
@@ -156,18 +226,18 @@ def get_abilities(pokemon: str) -> list[Ability]:
                 - WebRequestException
                 - WebParseException
     """
+    snapshot = get_snapshot()
+    record = snapshot.find_pokemon(pokemon) if snapshot is not None else None
+    if record is not None:
+        return [Ability(name.capitalize(), snapshot.find_ability_description(name) or '', hidden) for name, hidden in record.abilities]
+
     pokemon_info = _get_pokemon_lookup(pokemon, pokebase.pokemon)
-    abilities = []
-    for ability in pokemon_info.abilities:
-        poke_ability = pokebase.ability(ability.ability.name)
-        description = ""
-        for entry in poke_ability.effect_entries:
-            if entry.language.name == "en":
-                description = entry.short_effect
-                break
-        abilities.append(Ability(ability.ability.name.capitalize(), description, ability.is_hidden))
-    return abilities
+    names = [ability.ability.name for ability in pokemon_info.abilities]
+    descriptions = map_concurrent(_get_ability_description, names)
+    return [Ability(ability.ability.name.capitalize(), description, ability.is_hidden)
+        for ability, description in zip(pokemon_info.abilities, descriptions)]
 
+@cached('pokebase.evolutions')
 def get_evolutions(pokemon: str) -> list[Ability]:
     """
     Looks up all the evolutions of a pokemon using https://pokemondb.net/pokedex/.
@@ -186,6 +256,11 @@ def get_evolutions(pokemon: str) -> list[Ability]:
                 - WebRequestException
                 - WebParseException
     """
+    graph = get_evolution_graph()
+    chain = graph.get_chain(pokemon) if graph is not None else None
+    if chain is not None:
+        return [name.capitalize() for name in chain]
+
     pokemon_species = _get_pokemon_lookup(pokemon, pokebase.pokemon_species)
     evolution_chain = pokebase.evolution_chain(pokemon_species.evolution_chain.id)
 
@@ -198,6 +273,7 @@ def get_evolutions(pokemon: str) -> list[Ability]:
     get_evolution_names(evolution_chain.chain, names)
     return names
 
+@cached('pokebase.egg_group_pokemon')
 def get_egg_group_pokemon(egg_group: str) -> list[str]:
     """
     Looks up the pokemon in specified egg group using https://pokemondb.net/pokedex/. 
@@ -216,9 +292,51 @@ def get_egg_group_pokemon(egg_group: str) -> list[str]:
                 - WebRequestException
                 - WebParseException
     """
+    index = get_egg_group_index()
+    members = index.get_members(egg_group) if index is not None else None
+    if members is not None:
+        return [name.capitalize() for name in members]
+
     egg_group_info = _get_egg_group_lookup(egg_group, pokebase.egg_group)
     return [pokemon.name.capitalize() for pokemon in egg_group_info.pokemon_species]
 
+@cached('pokebase.breeding_partners')
+def get_breeding_partners(pokemon: str) -> list[str]:
+    """
+    Looks up every pokemon that can breed with the input pokemon, using the local egg group index when possible.
+    Either returns the compatible pokemon, or suggestions for pokemon names that are similar if that pokemon wasn't found.
+
+        Parameters:
+            pokemon (str): A pokemon to lookup in the db
+
+        Returns:
+            partners (list[str]): Every pokemon sharing an egg group with the input pokemon, plus Ditto. For Ditto, every pokemon that can breed.
+
+        Exceptions:
+            Throws:
+                - WebRequestException
+                - WebSuggestionException
+    """
+    index = get_egg_group_index()
+    partners = index.get_breeding_partners(pokemon) if index is not None else None
+    if partners is not None:
+        return [name.capitalize() for name in partners]
+
+    egg_groups = [egg_group.lower() for egg_group in get_egg_groups(pokemon)]
+    if 'no-eggs' in egg_groups:
+        return []
+    if 'ditto' in egg_groups:
+        # Ditto breeds with every pokemon that can breed at all, which is every egg group but its own and no-eggs
+        egg_groups = [egg_group_aliases.get(name.lower(), name.lower()) for name in all_egg_groups]
+        egg_groups = [egg_group for egg_group in egg_groups if egg_group not in ('ditto', 'no-eggs')]
+    else:
+        egg_groups.append('ditto')
+    partners = {}
+    for members in map_concurrent(get_egg_group_pokemon, egg_groups):
+        partners.update(dict.fromkeys(members))
+    return list(partners)
+
+@cached('pokebase.base_stats')
 def get_base_stats(pokemon: str) -> PokemonStats:
     """
     Looks up the base stats of a pokemon using https://pokemondb.net/pokedex/.
@@ -237,15 +355,35 @@ def get_base_stats(pokemon: str) -> PokemonStats:
                 - WebRequestException
                 - WebParseException
     """
+    snapshot = get_snapshot()
+    record = snapshot.find_pokemon(pokemon) if snapshot is not None else None
+    if record is not None:
+        return PokemonStats(*record.base_stats)
+
     pokemon_info = _get_pokemon_lookup(pokemon, pokebase.pokemon)
     return PokemonStats(*(pokemon_info.stats[i].base_stat for i in range(6)))
 
+@cached('pokebase.forms')
 def get_forms(pokemon: str) -> list[str]:
+    snapshot = get_snapshot()
+    species = snapshot.find_species(pokemon) if snapshot is not None else None
+    if species is not None:
+        return ['-'.join([n.capitalize() for n in form.split('-')]) for form in species.varieties]
+
     pokemon_species = _get_pokemon_lookup(pokemon, pokebase.pokemon_species)
     forms = []
     for form in pokemon_species.varieties:
         forms.append('-'.join([n.capitalize() for n in form.pokemon.name.split('-')]))
     return forms
 
-def get_pokemon_image_url(pokemon: str) -> str:
-    pass
+# Awaitable versions of the lookups, run on the shared scraper thread pool
+get_ev_yield_as_stats_async = awaitable(get_ev_yield_as_stats)
+get_ev_yield_async = awaitable(get_ev_yield)
+get_types_async = awaitable(get_types)
+get_egg_groups_async = awaitable(get_egg_groups)
+get_abilities_async = awaitable(get_abilities)
+get_evolutions_async = awaitable(get_evolutions)
+get_egg_group_pokemon_async = awaitable(get_egg_group_pokemon)
+get_breeding_partners_async = awaitable(get_breeding_partners)
+get_base_stats_async = awaitable(get_base_stats)
+get_forms_async = awaitable(get_forms)
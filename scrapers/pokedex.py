@@ -0,0 +1,340 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import scrapers
+import scrapers.pokebase
+import scrapers.pokemondb
+from scrapers.cache import is_cached
+from scrapers.executor import awaitable, map_batch
+from scrapers.snapshot import get_snapshot
+from scrapers.suggestions import screen_pokemon, screen_egg_group
+
+# Every backend raises subclasses of these, so callers can catch them regardless of which backend answered
+WebRequestException = scrapers.RequestException
+WebParseException = scrapers.ParseException
+WebSuggestionException = scrapers.SuggestionException
+WebBusyException = scrapers.BusyException
+
+_default_backend_timeout = 5.0
+_default_backend_max_in_flight = 8
+_default_snapshot_max_age = 180 * 24 * 60 * 60
+_latency_weight = 0.2
+_error_penalty = 10.0
+
+class PokedexRouterException(scrapers.RequestException):
+    """ Raised when no backend could answer a lookup. """
+    pass
+
+class SnapshotMissException(scrapers.RequestException):
+    """ The local snapshot doesn't contain the requested name. Not counted as a backend failure. """
+    pass
+
+class BackendSaturatedException(scrapers.RequestException):
+    """ The backend already has as many calls in flight as it's allowed, so it was skipped. Not counted as a backend failure. """
+    pass
+
+class Backend:
+    """ A scraper backend with moving averages of its upstream latency and error rate. """
+
+    def __init__(self, name: str, module, priority: int, cached_fn=None, local=False):
+        self.name = name
+        self.module = module
+        self.priority = priority
+        self.cached_fn = cached_fn
+        self.local = local
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.calls = 0
+        self.timed_calls = 0
+        self.failures = 0
+        self.skipped = 0
+        self.in_flight = 0
+        self.max_in_flight = scrapers.get_env_int('SCRAPER_BACKEND_MAX_IN_FLIGHT', _default_backend_max_in_flight)
+        self.__executor = None
+        self.__lock = threading.Lock()
+
+    def supports(self, fn_name: str) -> bool:
+        return hasattr(self.module, fn_name)
+
+    def is_cached(self, fn_name: str, *args) -> bool:
+        """ Returns True if the backend would answer the call from the cache, without an upstream request. """
+        return self.local or (self.cached_fn is not None and self.cached_fn(fn_name, *args))
+
+    def run(self, fn, args: tuple, timeout: float) -> tuple[object, float]:
+        """
+        Runs an upstream call on the backend's own thread pool, waiting at most timeout seconds from when the call starts running.
+        A call that times out is left running, its result still lands in the cache for the next lookup.
+        Each backend has its own pool, sized to its in-flight limit, so calls leaked by one hanging backend never delay another backend's calls.
+
+            Parameters:
+                fn: The backend getter
+                args (tuple): Arguments of the getter
+                timeout (float): Seconds the call may run for
+
+            Returns:
+                (result, latency): The return value of fn and the seconds it ran for
+
+            Exceptions:
+                Throws:
+                    - BackendSaturatedException if the backend already has max_in_flight calls running
+                    - concurrent.futures.TimeoutError if the call ran for longer than timeout
+                    - Anything raised by fn
+        """
+        with self.__lock:
+            if self.in_flight >= self.max_in_flight:
+                self.skipped += 1
+                raise BackendSaturatedException(f'{self.name} already has {self.in_flight} calls in flight.')
+            self.in_flight += 1
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix=f'scraper-{self.name}')
+
+        started = threading.Event()
+        call = {}
+        def run_call():
+            call['start'] = time.perf_counter()
+            started.set()
+            try:
+                return fn(*args)
+            finally:
+                with self.__lock:
+                    self.in_flight -= 1
+
+        future = self.__executor.submit(run_call)
+        # The pool has a thread per allowed call, so the call starts right away and the clock only covers the call itself
+        if not started.wait(timeout):
+            raise BackendSaturatedException(f'{self.name} did not start the call within {timeout} seconds.')
+        remaining = timeout - (time.perf_counter() - call['start'])
+        result = future.result(timeout=max(remaining, 0.0))
+        return (result, time.perf_counter() - call['start'])
+
+    def record(self, success: bool, latency: float = None):
+        """ Records the outcome of a call. Latency is only given for calls that reached the upstream. """
+        with self.__lock:
+            self.calls += 1
+            if not success:
+                self.failures += 1
+            self.error_rate += _latency_weight * ((0.0 if success else 1.0) - self.error_rate)
+            if latency is None:
+                return
+            self.timed_calls += 1
+            if self.timed_calls == 1:
+                self.latency = latency
+            else:
+                self.latency += _latency_weight * (latency - self.latency)
+
+    def score(self) -> float:
+        # Lower is better. Backends that keep failing are pushed back even if they fail fast.
+        # Backends without a measured latency rank behind measured ones, in priority order.
+        if self.timed_calls == 0:
+            return float('inf')
+        return self.latency * (1.0 + _error_penalty * self.error_rate) + self.error_rate
+
+    def to_dict(self):
+        return {
+            'priority': self.priority,
+            'calls': self.calls,
+            'timed_calls': self.timed_calls,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'in_flight': self.in_flight,
+            'latency_ms': 1000 * self.latency,
+            'error_rate': self.error_rate,
+        }
+
+class _SnapshotBackend:
+    """ Answers only from the local snapshot, through the pokebase getters which consult it before the network. """
+
+    def __init__(self):
+        for fn_name in ['get_ev_yield', 'get_ev_yield_as_stats', 'get_types', 'get_egg_groups', 'get_abilities', 'get_evolutions',
+                'get_base_stats', 'get_forms', 'get_breeding_partners']:
+            setattr(self, fn_name, self.__snapshot_only(getattr(scrapers.pokebase, fn_name), self.__has_pokemon))
+        self.get_egg_group_pokemon = self.__snapshot_only(scrapers.pokebase.get_egg_group_pokemon, self.__has_egg_group)
+
+    @staticmethod
+    def __has_pokemon(snapshot, name: str) -> bool:
+        return snapshot.find_pokemon(name) is not None or snapshot.find_species(name) is not None
+
+    @staticmethod
+    def __has_egg_group(snapshot, name: str) -> bool:
+        return snapshot.find_egg_group(name) is not None
+
+    @staticmethod
+    def __snapshot_only(fn, contains_fn):
+        def wrapper(name: str, *args):
+            snapshot = get_snapshot()
+            if snapshot is None or not contains_fn(snapshot, name):
+                raise SnapshotMissException(f'{name} is not in the local snapshot.')
+            return fn(name, *args)
+        return wrapper
+
+_g_backends = [] # type: list[Backend]
+_g_backends_lock = threading.Lock()
+
+def register_backend(name: str, module, priority: int, cached_fn=None, local=False):
+    """
+    Adds a backend to the router. Local backends are tried first while the snapshot is fresh, the rest best score first, ties broken by priority (lowest first).
+
+        Parameters:
+            name (str): Name used in logs and stats
+            module: Any object with the getter functions of scrapers.pokebase, missing getters are skipped
+            priority (int): Preferred order before any latency has been measured
+            cached_fn: Called with the getter name and arguments, returns True if the call would be answered from the cache. Cached calls aren't timed.
+            local (bool): True if the backend never makes network calls
+    """
+    with _g_backends_lock:
+        _g_backends.append(Backend(name, module, priority, cached_fn, local))
+
+def get_backend_stats() -> dict[str, dict]:
+    """ Returns the call counts, latency and error rate of every backend. """
+    return {backend.name: backend.to_dict() for backend in _g_backends}
+
+def _is_snapshot_fresh() -> bool:
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return False
+    return time.time() - snapshot.built_at <= scrapers.get_env_float('POKEDEX_SNAPSHOT_MAX_AGE', _default_snapshot_max_age)
+
+def _rank(backend: Backend, snapshot_fresh: bool) -> tuple:
+    return (not (backend.local and snapshot_fresh), backend.score(), backend.priority)
+
+def _call(fn_name: str, *args):
+    # Typos are answered from the local name indexes before any backend is asked
+    suggestions = (screen_egg_group if fn_name == 'get_egg_group_pokemon' else screen_pokemon)(args[0])
+    if suggestions is not None:
+        raise WebSuggestionException(suggestions)
+
+    snapshot_fresh = _is_snapshot_fresh()
+    backends = sorted([backend for backend in _g_backends if backend.supports(fn_name)], key=lambda b: _rank(b, snapshot_fresh))
+    timeout = scrapers.get_env_float('SCRAPER_BACKEND_TIMEOUT', _default_backend_timeout)
+    errors = []
+    busy = []
+    for backend in backends:
+        fn = getattr(backend.module, fn_name)
+        # Only calls that go upstream are timed, cache and snapshot answers would drag the latency average down
+        timed = not backend.is_cached(fn_name, *args)
+        start = time.perf_counter()
+        try:
+            if timed:
+                result, latency = backend.run(fn, args, timeout)
+            else:
+                result, latency = fn(*args), None
+        except SnapshotMissException:
+            continue
+        except BackendSaturatedException as e:
+            # Still busy with calls leaked by earlier timeouts, skipped without counting against it
+            errors.append(str(e))
+            continue
+        except FutureTimeoutError:
+            # The call ran on this backend for the whole timeout, so this backend is the slow one
+            backend.record(False, timeout)
+            errors.append(f'{backend.name} timed out after {timeout} seconds')
+            continue
+        except scrapers.BusyException as e:
+            # Dropped by our own rate limiter before reaching the backend, so it says nothing about its health
+            busy.append(e)
+            continue
+        except (scrapers.SuggestionException, scrapers.NotFoundException):
+            # The backend is healthy, the name just doesn't exist
+            backend.record(True, time.perf_counter() - start if timed else None)
+            raise
+        except Exception as e:
+            # Anything else, including connection errors a backend didn't wrap, means the backend is down
+            backend.record(False, time.perf_counter() - start if timed else None)
+            print(f'Backend {backend.name} failed {fn_name}{args}, failing over. Error: {e}')
+            errors.append(f'{backend.name}: {e}')
+            continue
+        backend.record(True, latency)
+        return result
+    if busy and not errors:
+        raise busy[-1]
+    raise PokedexRouterException(f'No backend could answer {fn_name}{args}. Errors: {"; ".join(errors) if errors else "no backend available"}')
+
+def _pokebase_is_cached(fn_name: str, *args) -> bool:
+    return is_cached(getattr(scrapers.pokebase, fn_name), *args)
+
+def _pokemondb_is_cached(fn_name: str, *args) -> bool:
+    # Every pokemon getter reads the one cached pokedex entry
+    if fn_name == 'get_egg_group_pokemon':
+        return is_cached(scrapers.pokemondb.get_egg_group_pokemon, *args)
+    return is_cached(scrapers.pokemondb.get_pokedex_entry, *args)
+
+register_backend('snapshot', _SnapshotBackend(), 0, local=True)
+register_backend('pokeapi', scrapers.pokebase, 1, _pokebase_is_cached)
+register_backend('pokemondb', scrapers.pokemondb, 2, _pokemondb_is_cached)
+
+def get_ev_yield(pokemon: str) -> list[str]:
+    """ Looks up the EV yield of a pokemon from the best available backend. See scrapers.pokebase.get_ev_yield. """
+    return _call('get_ev_yield', pokemon)
+
+def get_ev_yield_as_stats(pokemon: str):
+    """ Looks up the EV yield of a pokemon as PokemonStats from the best available backend. See scrapers.pokebase.get_ev_yield_as_stats. """
+    return _call('get_ev_yield_as_stats', pokemon)
+
+def get_types(pokemon: str) -> list[str]:
+    """ Looks up the type(s) of a pokemon from the best available backend. See scrapers.pokebase.get_types. """
+    return _call('get_types', pokemon)
+
+def get_egg_groups(pokemon: str) -> list[str]:
+    """ Looks up the egg group(s) of a pokemon from the best available backend. See scrapers.pokebase.get_egg_groups. """
+    return _call('get_egg_groups', pokemon)
+
+def get_abilities(pokemon: str) -> list:
+    """ Looks up the abilities of a pokemon from the best available backend. See scrapers.pokebase.get_abilities. """
+    return _call('get_abilities', pokemon)
+
+def get_evolutions(pokemon: str) -> list[str]:
+    """ Looks up all the evolutions of a pokemon from the best available backend. See scrapers.pokebase.get_evolutions. """
+    return _call('get_evolutions', pokemon)
+
+def get_egg_group_pokemon(egg_group: str) -> list[str]:
+    """ Looks up the pokemon in an egg group from the best available backend. See scrapers.pokebase.get_egg_group_pokemon. """
+    return _call('get_egg_group_pokemon', egg_group)
+
+def get_breeding_partners(pokemon: str) -> list[str]:
+    """ Looks up every pokemon that can breed with a pokemon. See scrapers.pokebase.get_breeding_partners. """
+    return _call('get_breeding_partners', pokemon)
+
+def get_base_stats(pokemon: str):
+    """ Looks up the base stats of a pokemon from the best available backend. See scrapers.pokebase.get_base_stats. """
+    return _call('get_base_stats', pokemon)
+
+def _is_local(pokemon: str) -> bool:
+    # In the snapshot, or cached by any backend
+    snapshot = get_snapshot()
+    if snapshot is not None and snapshot.find_pokemon(pokemon) is not None:
+        return True
+    return any(backend.is_cached('get_base_stats', pokemon) for backend in _g_backends if not backend.local and backend.supports('get_base_stats'))
+
+def get_base_stats_many(pokemon_list: list[str]) -> scrapers.BatchResult:
+    """
+    Looks up the base stats of many pokemon, each from the best available backend.
+    Pokemon in the local snapshot or cached by a backend are answered inline and the rest are fetched concurrently.
+
+        Parameters:
+            pokemon_list (list[str]): The pokemon to lookup, duplicates are looked up once
+
+        Returns:
+            results (scrapers.BatchResult): PokemonStats or the exception raised for it, per pokemon in input order
+    """
+    return map_batch(get_base_stats, pokemon_list, _is_local)
+
+def get_forms(pokemon: str) -> list[str]:
+    """ Looks up the forms of a pokemon. See scrapers.pokebase.get_forms. """
+    return _call('get_forms', pokemon)
+
+def get_pokemon_artwork_url(pokemon: str) -> str:
+    """ Builds the artwork URL of a pokemon without checking it exists. See scrapers.pokemondb.get_pokemon_artwork_url. """
+    return scrapers.pokemondb.get_pokemon_artwork_url(pokemon)
+
+# Awaitable versions of the lookups, run on the shared scraper thread pool
+get_ev_yield_async = awaitable(get_ev_yield)
+get_ev_yield_as_stats_async = awaitable(get_ev_yield_as_stats)
+get_types_async = awaitable(get_types)
+get_egg_groups_async = awaitable(get_egg_groups)
+get_abilities_async = awaitable(get_abilities)
+get_evolutions_async = awaitable(get_evolutions)
+get_egg_group_pokemon_async = awaitable(get_egg_group_pokemon)
+get_breeding_partners_async = awaitable(get_breeding_partners)
+get_base_stats_async = awaitable(get_base_stats)
+get_forms_async = awaitable(get_forms)
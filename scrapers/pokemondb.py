@@ -1,9 +1,13 @@
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree
 from requests.api import request
 from utility.pokemon import PokemonStats
 
 import scrapers
+import scrapers.session
+from scrapers.executor import awaitable
+from scrapers.cache import cached
+from scrapers.suggestions import screen_pokemon, screen_egg_group
 
 class PokemonDBScraperException(scrapers.ScraperException):
     """ Base exception class for this module. """
@@ -35,48 +39,204 @@ class Ability:
             self.description
         )
 
-def _parse_suggestions(search_item, soup):
+def _has_class(name: str) -> str:
+    # XPath predicate matching one class token, the same way BeautifulSoup's class filter does
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+# Compiled once, so each page lookup only runs the queries instead of walking a BeautifulSoup tree
+_xpath_suggestion_items = etree.XPath('//li')
+_xpath_suggestion_link = etree.XPath('.//a[@href][1]')
+_xpath_vitals_row_th = etree.XPath('//th[normalize-space() = $name][1]')
+_xpath_row_td = etree.XPath('../td[1]')
+_xpath_row_text_td = etree.XPath(f'../td[{_has_class("text")}][1]')
+_xpath_links = etree.XPath('.//a')
+_xpath_base_stats_table = etree.XPath(f'//h2[normalize-space() = "Base stats"][1]/..//table[{_has_class("vitals-table")}][1]')
+_xpath_rows = etree.XPath('.//tr')
+_xpath_row_th = etree.XPath('./th[1]')
+_xpath_row_first_td = etree.XPath('./td[1]')
+_xpath_evolution_names = etree.XPath(f'//div[{_has_class("infocard-list-evo")}]//a[{_has_class("ent-name")}]')
+_xpath_ent_names = etree.XPath(f'//a[{_has_class("ent-name")}]')
+
+def _get_text(element) -> str:
+    return ''.join(text.strip() for text in element.itertext())
+
+def _parse_suggestions(search_item, tree):
     suggestions = []
-    for li in soup.find_all('li'):
-        a = li.find('a', href=True)
-        if a is None:
+    for li in _xpath_suggestion_items(tree):
+        a = _xpath_suggestion_link(li)
+        if len(a) == 0:
             raise WebParseException('Failed to parse "a" from "li" for word suggestions.')
 
-        if a['href'] is not None and len(a['href'].split('/')) == 3:
-            suggestions.append(a['href'].split('/')[-1].replace('-', ' '))
+        href = a[0].get('href')
+        if href is not None and len(href.split('/')) == 3:
+            suggestions.append(href.split('/')[-1].replace('-', ' '))
 
     if len(suggestions) == 0:
         raise WebParseException(f'Failed to find any suggestions for {search_item}.')
     return suggestions
 
-def _get_page_info(search_item, url):
-    response = requests.get(url)
-    soup = None
-    if response.text is not None:
-        # Create soup
+def _get_page_info(search_item, url, parse_fn, namespace):
+    def parse(response):
+        tree = None
+        if response.content:
+            # Parse the page
+            try:
+                tree = scrapers.session.parse_html(response)
+            except Exception as e:
+                raise WebParseException(f'Failed to parse response using lxml. Error: {e}')
+
+        # Check for errors
         try:
-            soup = BeautifulSoup(response.text, 'lxml')
-        except Exception as e:
-            raise WebParseException(f'Failed to parse response using lxml. Error: {e}')
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            if response.status_code == 404 and tree is not None:
+                raise WebSuggestionException(_parse_suggestions(search_item, tree))
+            else:
+                raise WebRequestException(f'Failed to GET request to URL {url}. Error: {e}')
+
+        if tree is None:
+            raise WebParseException(f'Failed to parse page for URL {url}.')
+        return parse_fn(tree)
 
-    # Check for errors
+    # Unchanged pages are answered 304 by pokemondb.net, and the stored parse result is reused
     try:
-        response.raise_for_status()
+        return scrapers.session.get_revalidated(url, parse, namespace)
     except requests.exceptions.RequestException as e:
-        if response.status_code == 404 and soup is not None:
-            raise WebSuggestionException(_parse_suggestions(search_item, soup))
-        else:
-            raise WebRequestException(f'Failed to GET request to URL {url}. Error: {e}')
+        raise WebRequestException(f'Failed to GET request to URL {url}. Error: {e}')
+
+def _screen(name: str, screen_fn):
+    # Names that look like a typo of a known name are answered locally, without fetching the 404 page
+    suggestions = screen_fn(name)
+    if suggestions is not None:
+        raise WebSuggestionException(suggestions)
+
+def _get_pokemon_pokedex_entry(pokemon, parse_fn):
+    _screen(pokemon, screen_pokemon)
+    return _get_page_info(pokemon, f'https://pokemondb.net/pokedex/{pokemon}', parse_fn, 'pokemondb.pokedex')
+
+def _get_egg_group(egg_group, parse_fn):
+    _screen(egg_group, screen_egg_group)
+    return _get_page_info(egg_group, f'https://pokemondb.net/egg-group/{egg_group}', parse_fn, 'pokemondb.egg_group')
+
+def _find_vitals_links(pokemon: str, tree, name: str) -> list:
+    th = _xpath_vitals_row_th(tree, name=name)
+    if len(th) == 0:
+        raise WebParseException(f'Failed to find {name} for {pokemon}. Failed to parse "th" with text "{name}" from webpage.')
+
+    td = _xpath_row_td(th[0])
+    if len(td) == 0:
+        raise WebParseException(f'Failed to find {name} for {pokemon}. Failed to parse "td" from "{name}".')
+
+    links = _xpath_links(td[0])
+    if len(links) == 0:
+        raise WebParseException(f'Failed to find {name} for {pokemon}. Failed to find any "a" in the "td" element for "{name}".')
+    return links
+
+def _parse_ev_yield(pokemon: str, tree) -> list[str]:
+    # Parse EV yield
+    th = _xpath_vitals_row_th(tree, name='EV yield')
+    if len(th) == 0:
+        raise WebParseException(f'Failed to find EV yield for {pokemon}. Failed to parse "th" with text "EV yield" from webpage.')
+
+    # Parse the EV value
+    td = _xpath_row_text_td(th[0])
+    if len(td) == 0:
+        raise WebParseException(f'Failed to find EV yield for {pokemon}. Failed to parse "td" from "EV yield".')
+    return td[0].text_content().strip().split(', ')
+
+def _parse_types(pokemon: str, tree) -> list[str]:
+    return [_get_text(a) for a in _find_vitals_links(pokemon, tree, 'Type')]
+
+def _parse_egg_groups(pokemon: str, tree) -> list[str]:
+    return [_get_text(a) for a in _find_vitals_links(pokemon, tree, 'Egg Groups')]
+
+def _parse_abilities(pokemon: str, tree) -> list[Ability]:
+    abilities = []
+    for a in _find_vitals_links(pokemon, tree, 'Abilities'):
+        hidden = a.getparent().tag == 'small'
+        abilities.append(Ability(_get_text(a), a.get('title', ''), hidden))
+    return abilities
+
+def _parse_evolutions(pokemon: str, tree) -> list[str]:
+    evolutions = []
+    for a in _xpath_evolution_names(tree):
+        evolution = _get_text(a)
+        if evolution not in evolutions:
+            evolutions.append(evolution)
+    if len(evolutions) == 0:
+        raise WebParseException(f'Failed to find Evolutions for {pokemon}. Failed to find any "a" in the "div" element with class "infocard-list-evo".')
+    return evolutions
+
+def _parse_base_stats(pokemon: str, tree) -> PokemonStats:
+    # Parse the Vitals Table
+    base_stats = PokemonStats()
+    vitals = _xpath_base_stats_table(tree)
+    if len(vitals) == 0:
+        raise WebParseException(f'Failed to find Base Stats for {pokemon}. Failed to parse "table" with class "vitals-table" under the "Base stats" header.')
+
+    rows = _xpath_rows(vitals[0])
+    if len(rows) == 0:
+        raise WebParseException(f'Failed to find Base Stats for {pokemon}. Found 0 entries for "tr" from Vitals Table.')
+    for row in rows:
+        stat = _xpath_row_th(row)
+        if len(stat) == 0:
+            raise WebParseException(f'Failed to find Base Stats for {pokemon}. Failed to parse "th" from Vitals Table row.')
+        stat_text = stat[0].text_content().strip().lower().replace('. ', '_')
+
+        if not hasattr(base_stats, stat_text):
+            raise WebParseException(f'Failed to find Base Stats for {pokemon}. PokemonStats object does not contain an attribute called {stat_text}.')
+
+        base_stat = _xpath_row_first_td(row)
+        if len(base_stat) == 0:
+            raise WebParseException(f'Failed to find Base Stats for {pokemon}. Failed to parse the "td" from Vitals Table row.')
+        setattr(base_stats, stat_text, int(base_stat[0].text_content().strip()))
+    return base_stats
+
+class PokedexEntry:
+    """ Every field of a pokemondb.net pokedex page, parsed in a single pass. Fields that failed to parse keep their error. """
+    fields = {
+        'ev_yield': _parse_ev_yield,
+        'types': _parse_types,
+        'egg_groups': _parse_egg_groups,
+        'abilities': _parse_abilities,
+        'evolutions': _parse_evolutions,
+        'base_stats': _parse_base_stats,
+    }
+
+    def __init__(self, pokemon: str, tree):
+        self.pokemon = pokemon
+        self.values = {}
+        self.errors = {}
+        for field, parse_fn in PokedexEntry.fields.items():
+            try:
+                self.values[field] = parse_fn(pokemon, tree)
+            except WebParseException as e:
+                self.errors[field] = str(e)
+
+    def get(self, field: str):
+        if field in self.errors:
+            raise WebParseException(self.errors[field])
+        return self.values[field]
+
+@cached('pokemondb.entry')
+def get_pokedex_entry(pokemon: str) -> PokedexEntry:
+    """
+    Downloads and parses the https://pokemondb.net/pokedex/ page of a pokemon into a PokedexEntry.
+    The parsed entry is cached, so every getter of this module shares one download and one parse per pokemon.
 
-    if soup is None:
-        raise WebParseException(f'Failed to parse soup for URL {url}.')
-    return soup
+        Parameters:
+            pokemon (str): A pokemon to lookup in the db
 
-def _get_pokemon_pokedex_entry(pokemon):
-    return _get_page_info(pokemon, f'https://pokemondb.net/pokedex/{pokemon}')
+        Returns:
+            entry (PokedexEntry): The parsed page
 
-def _get_egg_group(egg_group):
-    return _get_page_info(egg_group, f'https://pokemondb.net/egg-group/{egg_group}')
+        Exceptions:
+            Throws:
+                - WebRequestException
+                - WebParseException
+                - WebSuggestionException
+    """
+    return _get_pokemon_pokedex_entry(pokemon, lambda tree: PokedexEntry(pokemon, tree))
 
 def get_ev_yield(pokemon: str) -> list[str]:
     """
@@ -95,17 +255,7 @@ def get_ev_yield(pokemon: str) -> list[str]:
                 - WebParseException
                 - WebSuggestionException
     """
-    # Parse EV yield
-    soup = _get_pokemon_pokedex_entry(pokemon)
-    ev_yield_name = soup.find('th', text='EV yield')
-    if ev_yield_name is None:
-        raise WebParseException(f'Failed to find EV yield for {pokemon}. Failed to parse "th" with text "EV yield" from webpage.')
-
-    # Parse the EV value
-    ev_value = ev_yield_name.parent.find('td', {'class': 'text'})
-    if ev_value is None:
-        raise WebParseException(f'Failed to find EV yield for {pokemon}. Failed to parse "td" from "EV yield".')
-    return ev_value.get_text(strip=True).split(', ')
+    return get_pokedex_entry(pokemon).get('ev_yield')
 
 def get_ev_yield_as_stats(pokemon: str) -> PokemonStats:
     """
@@ -165,22 +315,7 @@ def get_types(pokemon: str) -> list[str]:
                 - WebRequestException
                 - WebParseException
     """
-    # Parse the Type
-    soup = _get_pokemon_pokedex_entry(pokemon)
-    type_name = soup.find('th', text='Type')
-    if type_name is None:
-        raise WebParseException(f'Failed to find Type for {pokemon}. Failed to parse "th" with text "Type" from webpage.')
-    
-    # Parse the Type value
-    type_value_group = type_name.parent.find('td')
-    if type_value_group is None:
-        raise WebParseException(f'Failed to find Type for {pokemon}. Failed to parse "td" from "Type".')
-
-    # Read out all the types
-    types = [span.get_text(strip=True) for span in type_value_group.find_all('a')]
-    if len(types) == 0:
-        raise WebParseException(f'Failed to find Type for {pokemon}. Failed to find any "a" in the "td" element for "Type".')
-    return types
+    return get_pokedex_entry(pokemon).get('types')
 
 def get_egg_groups(pokemon: str) -> list[str]:
     """
@@ -200,22 +335,7 @@ def get_egg_groups(pokemon: str) -> list[str]:
                 - WebRequestException
                 - WebParseException
     """
-    # Parse the Type
-    soup = _get_pokemon_pokedex_entry(pokemon)
-    egg_groups_name = soup.find('th', text='Egg Groups')
-    if egg_groups_name is None:
-        raise WebParseException(f'Failed to find Egg Groups for {pokemon}. Failed to parse "th" with text "Egg Groups" from webpage.')
-    
-    # Parse the Type value
-    egg_groups_list = egg_groups_name.parent.find('td')
-    if egg_groups_list is None:
-        raise WebParseException(f'Failed to find Type for {pokemon}. Failed to parse "td" from "Egg Groups".')
-
-    # Read out all the types
-    egg_groups = [span.get_text(strip=True) for span in egg_groups_list.find_all('a')]
-    if len(egg_groups) == 0:
-        raise WebParseException(f'Failed to find Type for {pokemon}. Failed to find any "a" in the "td" element for "Egg Groups".')
-    return egg_groups
+    return get_pokedex_entry(pokemon).get('egg_groups')
 
 def get_abilities(pokemon: str) -> list[Ability]:
     """
@@ -235,28 +355,7 @@ def get_abilities(pokemon: str) -> list[Ability]:
                 - WebRequestException
                 - WebParseException
     """
-    # Parse the Type
-    soup = _get_pokemon_pokedex_entry(pokemon)
-    abilities_name = soup.find('th', text='Abilities')
-    if abilities_name is None:
-        raise WebParseException(f'Failed to find Abilities for {pokemon}. Failed to parse "th" with text "Abilities" from webpage.')
-    
-    # Parse the Type value
-    abilities_list = abilities_name.parent.find('td')
-    if abilities_list is None:
-        raise WebParseException(f'Failed to find Type for {pokemon}. Failed to parse "td" from "Abilities".')
-
-    abilities = []
-    for a in abilities_list.find_all('a'):
-        name = a.get_text(strip=True)
-        description = ''
-        if a.has_attr('title'):
-            description = a['title']
-        hidden = a.parent.name == 'small'
-        abilities.append(Ability(name, description, hidden))
-    if len(abilities) == 0:
-        raise WebParseException(f'Failed to find Abilities for {pokemon}. Failed to find any "a" in the "td" element for "Abilities".')
-    return abilities
+    return get_pokedex_entry(pokemon).get('abilities')
 
 def get_evolutions(pokemon: str) -> list[Ability]:
     """
@@ -276,18 +375,9 @@ def get_evolutions(pokemon: str) -> list[Ability]:
                 - WebRequestException
                 - WebParseException
     """
-    # Parse the Type
-    soup = _get_pokemon_pokedex_entry(pokemon)
-    evolutions = []
-    for evolution_list in soup.find_all('div', {'class': 'infocard-list-evo'}):
-        for a in evolution_list.find_all('a', {'class': 'ent-name'}):
-            evolution = a.get_text(strip=True)
-            if evolution not in evolutions:
-                evolutions.append(evolution)
-    if len(evolutions) == 0:
-        raise WebParseException(f'Failed to find Evolutions for {pokemon}. Failed to find any "a" in the "div" element with class "infocard-list-evo".')
-    return evolutions
+    return get_pokedex_entry(pokemon).get('evolutions')
 
+@cached('pokemondb.egg_group_pokemon')
 def get_egg_group_pokemon(egg_group: str) -> list[str]:
     """
     Looks up the pokemon in specified egg group using https://pokemondb.net/pokedex/. 
@@ -306,13 +396,14 @@ def get_egg_group_pokemon(egg_group: str) -> list[str]:
                 - WebRequestException
                 - WebParseException
     """
-    soup = _get_egg_group(egg_group)
-    pokemon = []
-    for span in soup.find_all('a', {'class': 'ent-name'}):
-        pokemon.append(span.get_text(strip=True))
-    if len(pokemon) == 0:
-        raise WebParseException(f'Failed to find pokemon for egg group {egg_group}. Failed to find any "a" in the web page with class "ent-name".')
-    return pokemon
+    def parse(tree):
+        pokemon = []
+        for a in _xpath_ent_names(tree):
+            pokemon.append(_get_text(a))
+        if len(pokemon) == 0:
+            raise WebParseException(f'Failed to find pokemon for egg group {egg_group}. Failed to find any "a" in the web page with class "ent-name".')
+        return pokemon
+    return _get_egg_group(egg_group, parse)
 
 def get_base_stats(pokemon: str) -> PokemonStats:
     """
@@ -332,39 +423,32 @@ def get_base_stats(pokemon: str) -> PokemonStats:
                 - WebRequestException
                 - WebParseException
     """
-    # Parse the Vitals Table
-    soup = _get_pokemon_pokedex_entry(pokemon)
-    base_stats = PokemonStats()
-    base_stats_header = soup.find('h2', text='Base stats')
-    if base_stats_header is None:
-        raise WebParseException(f'Failed to find Base Stats for {pokemon}. Failed to parse "h2" with text "Base stats" from webpage.')
-    vitals = base_stats_header.parent.find('table', {'class': 'vitals-table'})
-    if vitals is None:
-        raise WebParseException(f'Failed to find Base Stats for {pokemon}. Failed to parse "table" with class "vitals-table" from Base stats div.')
-
-    rows = vitals.find_all('tr')
-    if len(rows) == 0:
-        raise WebParseException(f'Failed to find Base Stats for {pokemon}. Found 0 entries for "tr" from Vitals Table.')
-    for row in vitals.find_all('tr'):
-        stat = row.find('th')
-        if stat is None:
-            raise WebParseException(f'Failed to find Base Stats for {pokemon}. Failed to parse "th" from Vitals Table row.')
-        stat_text = stat.get_text(strip=True).lower().replace('. ', '_')
+    return get_pokedex_entry(pokemon).get('base_stats')
 
-        if not hasattr(base_stats, stat_text):
-            raise WebParseException(f'Failed to find Base Stats for {pokemon}. PokemonStats object does not contain an attribute called {stat_text}.')
+def get_pokemon_artwork_url(pokemon: str) -> str:
+    """
+    Builds the URL of the official artwork of a pokemon on the pokemondb.net CDN, without sending any request.
+    The name is only screened for typos, a name the CDN doesn't know fails when the image is downloaded.
 
-        base_stat = row.find('td')
-        if base_stats is None:
-            raise WebParseException(f'Failed to find Base Stats for {pokemon}. Failed to parse the "td" from Vitals Table row.')
-        setattr(base_stats, stat_text, int(base_stat.get_text(strip=True)))
-    return base_stats
+        Parameters:
+            pokemon (str): A pokemon to lookup the artwork of
 
-def get_pokemon_image_url(pokemon: str) -> str:
-    url = f'https://img.pokemondb.net/artwork/{pokemon}.jpg'
-    response = requests.get(url)
-    try:
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        raise WebRequestException(f'Failed to GET request to URL {url}. Error: {e}')
-    return url
+        Returns:
+            url (str): The artwork URL
+
+        Exceptions:
+            Throws:
+                - WebSuggestionException
+    """
+    _screen(pokemon, screen_pokemon)
+    return f'https://img.pokemondb.net/artwork/{pokemon.lower()}.jpg'
+
+# Awaitable versions of the lookups, run on the shared scraper thread pool
+get_ev_yield_async = awaitable(get_ev_yield)
+get_ev_yield_as_stats_async = awaitable(get_ev_yield_as_stats)
+get_types_async = awaitable(get_types)
+get_egg_groups_async = awaitable(get_egg_groups)
+get_abilities_async = awaitable(get_abilities)
+get_evolutions_async = awaitable(get_evolutions)
+get_egg_group_pokemon_async = awaitable(get_egg_group_pokemon)
+get_base_stats_async = awaitable(get_base_stats)
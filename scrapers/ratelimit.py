@@ -0,0 +1,103 @@
+import functools
+import threading
+import time
+
+import scrapers
+
+_default_rate = 5.0
+_default_burst = 5
+_default_max_in_flight = 4
+_default_queue_timeout = 10.0
+
+class HostLimiter:
+    """
+    Limits the requests sent to one upstream host: a token bucket caps the request rate, and a semaphore caps the requests in flight.
+    Callers queue for both until a deadline, after which scrapers.BusyException is raised instead of piling up more work.
+    """
+
+    def __init__(self, host: str, rate: float, burst: int, max_in_flight: int, queue_timeout: float):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.queue_timeout = queue_timeout
+        self.rejected = 0
+        self.__tokens = float(burst)
+        self.__last_refill = time.monotonic()
+        self.__lock = threading.Lock()
+        self.__in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    def __take_token(self, deadline: float) -> bool:
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(self.burst, self.__tokens + (now - self.__last_refill) * self.rate)
+                self.__last_refill = now
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return True
+                wait = (1 - self.__tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def acquire(self):
+        """
+        Waits for a free request slot and a token, holding the slot until release is called.
+
+            Exceptions:
+                Throws:
+                    - scrapers.BusyException if the host stays saturated for longer than the queue timeout
+        """
+        deadline = time.monotonic() + self.queue_timeout
+        if not self.__in_flight.acquire(timeout=self.queue_timeout):
+            self.__reject()
+        if not self.__take_token(deadline):
+            self.__in_flight.release()
+            self.__reject()
+
+    def release(self):
+        self.__in_flight.release()
+
+    def __reject(self):
+        with self.__lock:
+            self.rejected += 1
+        raise scrapers.BusyException(f'Too many requests queued for {self.host}, gave up after {self.queue_timeout} seconds.')
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+_g_limiters = {} # type: dict[str, HostLimiter]
+_g_limiters_lock = threading.Lock()
+
+def get_limiter(host: str) -> HostLimiter:
+    """
+    Returns the limiter of an upstream host, creating it on first use.
+    Limits are read from the SCRAPER_RATE_LIMIT (requests per second), SCRAPER_RATE_BURST, SCRAPER_MAX_IN_FLIGHT
+    and SCRAPER_QUEUE_TIMEOUT (seconds) environment variables, and apply to each host separately.
+    """
+    limiter = _g_limiters.get(host)
+    if limiter is None:
+        with _g_limiters_lock:
+            limiter = _g_limiters.get(host)
+            if limiter is None:
+                limiter = HostLimiter(host,
+                    scrapers.get_env_float('SCRAPER_RATE_LIMIT', _default_rate),
+                    int(scrapers.get_env_float('SCRAPER_RATE_BURST', _default_burst)),
+                    int(scrapers.get_env_float('SCRAPER_MAX_IN_FLIGHT', _default_max_in_flight)),
+                    scrapers.get_env_float('SCRAPER_QUEUE_TIMEOUT', _default_queue_timeout))
+                _g_limiters[host] = limiter
+    return limiter
+
+def rate_limited(host: str):
+    """ Decorator that runs every call of a blocking function under the limiter of host. """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_limiter(host):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
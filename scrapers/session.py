@@ -0,0 +1,207 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import lxml.html
+import requests
+from requests.adapters import HTTPAdapter
+
+import scrapers
+from scrapers.ratelimit import get_limiter
+from scrapers.circuit import get_breaker, is_outage
+from scrapers.cache import DiskCache
+
+_default_connect_timeout = 3.05
+_default_read_timeout = 10.0
+_default_pool_size = 10
+_default_retries = 2
+_default_backoff = 0.5
+_max_backoff = 8.0
+_default_http_cache_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'http.sqlite')
+_default_http_cache_bytes = 64 * 1024 * 1024
+# Validated pages are kept until the size limit evicts them, their freshness is decided by the server on every revalidation
+_http_cache_ttl = 10 * 365 * 24 * 60 * 60
+
+# Statuses worth retrying, anything else is the upstream's final answer
+_retry_statuses = {429, 500, 502, 503, 504}
+
+_g_session = None
+_g_session_lock = threading.Lock()
+_g_http_cache = None
+_g_http_cache_loaded = False
+
+def get_session() -> requests.Session:
+    """
+    Returns the HTTP session shared by all scrapers, creating it on first use.
+    Connections are kept alive and pooled per host, at most SCRAPER_HTTP_POOL_SIZE per host; further requests wait for a free connection.
+    """
+    global _g_session
+    if _g_session is None:
+        with _g_session_lock:
+            if _g_session is None:
+                pool_size = scrapers.get_env_int('SCRAPER_HTTP_POOL_SIZE', _default_pool_size)
+                session = requests.Session()
+                # Retries are done in get() so they can be jittered and bounded
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _g_session = session
+    return _g_session
+
+def _get_backoff(attempt: int, response: requests.Response) -> float:
+    if response is not None and response.status_code == 429:
+        # Honour the server's Retry-After if it's given in seconds and not unreasonably long
+        try:
+            return min(float(response.headers['Retry-After']), _max_backoff)
+        except (KeyError, ValueError):
+            pass
+    base = scrapers.get_env_float('SCRAPER_HTTP_BACKOFF', _default_backoff)
+    return random.uniform(0, min(_max_backoff, base * 2 ** attempt))
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Sends a request on the shared session with connect/read timeouts, retrying 5xx, 429 and connection errors with jittered exponential backoff.
+    Every attempt waits for the rate limiter of the host, and the host's circuit breaker fails the request fast while it is open.
+
+        Parameters:
+            method (str): The HTTP method
+            url (str): The URL to request
+            **kwargs: Passed on to requests.Session.request
+
+        Returns:
+            response (requests.Response): The last response received, which may still be an error status
+
+        Exceptions:
+            Throws:
+                - requests.exceptions.RequestException if the last attempt couldn't connect or timed out
+                - scrapers.BusyException if the host's request queue is full
+                - scrapers.circuit.CircuitOpenException if the host has been failing
+    """
+    kwargs.setdefault('timeout', (scrapers.get_env_float('SCRAPER_HTTP_CONNECT_TIMEOUT', _default_connect_timeout),
+        scrapers.get_env_float('SCRAPER_HTTP_READ_TIMEOUT', _default_read_timeout)))
+    retries = scrapers.get_env_int('SCRAPER_HTTP_RETRIES', _default_retries)
+    host = urlsplit(url).hostname
+    breaker = get_breaker(host)
+    probe = breaker.before()
+    try:
+        response = _request_with_retries(method, url, host, retries, **kwargs)
+    except scrapers.BusyException:
+        # Shed by the rate limiter, the upstream was never asked
+        breaker.release(probe)
+        raise
+    except Exception as e:
+        breaker.record(not is_outage(e))
+        raise
+    breaker.record(response.status_code < 500 and response.status_code != 429)
+    return response
+
+def _request_with_retries(method: str, url: str, host: str, retries: int, **kwargs) -> requests.Response:
+    attempt = 0
+    while True:
+        response = None
+        try:
+            with get_limiter(host):
+                response = get_session().request(method, url, **kwargs)
+            if response.status_code not in _retry_statuses or attempt >= retries:
+                return response
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt >= retries:
+                raise
+            print(f'{method} {url} failed, retrying. Error: {e}')
+        delay = _get_backoff(attempt, response)
+        if response is not None:
+            print(f'{method} {url} returned {response.status_code}, retrying in {delay:.2f} seconds.')
+        time.sleep(delay)
+        attempt += 1
+
+def get(url: str, **kwargs) -> requests.Response:
+    """ Sends a GET request on the shared session. See request. """
+    return request('GET', url, **kwargs)
+
+def head(url: str, **kwargs) -> requests.Response:
+    """ Sends a HEAD request on the shared session. See request. """
+    return request('HEAD', url, **kwargs)
+
+class CachedPage:
+    """ The validators and parse result of a page, for revalidating it with a conditional GET. """
+
+    def __init__(self, etag: str, last_modified: str, result):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.result = result
+
+def parse_html(response: requests.Response):
+    """
+    Parses an HTML response with lxml.
+    The page is decoded with the charset of its Content-Type header, like response.text, and only falls back to the charset the page declares when the header has none.
+
+        Parameters:
+            response (requests.Response): The response to parse
+
+        Returns:
+            tree (lxml.html.HtmlElement): The root element of the page
+
+        Exceptions:
+            Throws:
+                - Anything raised by lxml.html.fromstring, for example on an empty page
+    """
+    parser = None
+    if 'charset' in response.headers.get('Content-Type', '').lower() and response.encoding:
+        parser = lxml.html.HTMLParser(encoding=response.encoding)
+    return lxml.html.fromstring(response.content, parser=parser)
+
+def get_http_cache() -> DiskCache:
+    """
+    Returns the on-disk cache of validated pages, or None if it can't be opened.
+    Configured with the SCRAPER_HTTP_CACHE_PATH and SCRAPER_HTTP_CACHE_BYTES environment variables.
+    """
+    global _g_http_cache, _g_http_cache_loaded
+    if not _g_http_cache_loaded:
+        with _g_session_lock:
+            if not _g_http_cache_loaded:
+                path = os.environ.get('SCRAPER_HTTP_CACHE_PATH', _default_http_cache_path)
+                try:
+                    _g_http_cache = DiskCache(path, scrapers.get_env_int('SCRAPER_HTTP_CACHE_BYTES', _default_http_cache_bytes), _http_cache_ttl)
+                except Exception as e:
+                    print(f'Failed to open HTTP cache {path}, pages will always be downloaded in full. Error: {e}')
+                _g_http_cache_loaded = True
+    return _g_http_cache
+
+def get_revalidated(url: str, parse_fn, namespace: str):
+    """
+    Sends a conditional GET for a page fetched before, reusing the stored parse result when the server answers 304 Not Modified.
+    Successful responses carrying an ETag or Last-Modified header are stored on disk with their parse result.
+
+        Parameters:
+            url (str): The URL to request
+            parse_fn: Called with the requests.Response of a full download, returns a picklable result or raises
+            namespace (str): Identifies the parser, stored results of one parser are never handed to another
+
+        Returns:
+            The parse result of the page
+
+        Exceptions:
+            Throws:
+                - Anything raised by request or parse_fn
+    """
+    cache = get_http_cache()
+    key = f'{namespace}:{url}'
+    found, page, _expires_at = cache.get(key) if cache is not None else (False, None, 0.0)
+    headers = {}
+    if found:
+        if page.etag is not None:
+            headers['If-None-Match'] = page.etag
+        if page.last_modified is not None:
+            headers['If-Modified-Since'] = page.last_modified
+
+    response = get(url, headers=headers)
+    if found and response.status_code == 304:
+        return page.result
+
+    result = parse_fn(response)
+    etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+    if cache is not None and response.status_code == 200 and (etag is not None or last_modified is not None):
+        cache.set(key, CachedPage(etag, last_modified, result), time.time() + _http_cache_ttl)
+    return result
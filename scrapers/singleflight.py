@@ -0,0 +1,77 @@
+import copy
+import functools
+import threading
+
+import scrapers
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """ Makes concurrent callers asking for the same key share one in-flight call and its result or error. """
+
+    def __init__(self):
+        self.__calls = {} # type: dict[str, _Call]
+        self.__lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: str, fn, *args, **kwargs):
+        """
+        Calls fn(*args, **kwargs) unless a call for the same key is already running, in which case its outcome is shared.
+
+            Parameters:
+                key (str): Identifies calls that are interchangeable
+                fn: The function to call
+
+            Returns:
+                The return value of the (possibly shared) call. Its exception is raised instead if it failed.
+        """
+        with self.__lock:
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.__calls[key] = call
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                # Each waiter raises its own copy, so they don't all grow and share the leader's traceback
+                raise copy.copy(call.error)
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+            call.done.set()
+        return call.result
+
+_g_single_flight = SingleFlight()
+
+def get_single_flight() -> SingleFlight:
+    """ Returns the single-flight group shared by all scrapers. """
+    return _g_single_flight
+
+def coalesce(namespace: str):
+    """
+    Decorator making concurrent calls with the same (case insensitive) arguments share one upstream call.
+
+        Parameters:
+            namespace (str): Prefix of the in-flight keys, unique per decorated function
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return _g_single_flight.do(scrapers.make_key(namespace, args, kwargs), fn, *args, **kwargs)
+        return wrapper
+    return decorator
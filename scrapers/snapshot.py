@@ -0,0 +1,244 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import threading
+
+import scrapers
+
+SNAPSHOT_VERSION = 1
+
+_default_snapshot_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'pokedex.sqlite')
+_english_language_id = '9'
+
+# The egg group names shown to users don't all match the PokeAPI identifiers
+egg_group_aliases = {
+    'field': 'ground',
+    'grass': 'plant',
+    'amorphous': 'indeterminate',
+    'undiscovered': 'no-eggs',
+    'human-like': 'humanshape',
+}
+
+class PokedexSnapshotException(scrapers.ScraperException):
+    """ Base exception class for this module. """
+    pass
+
+class SnapshotPokemon:
+    def __init__(self, name: str, species: str, base_stats: list[int], ev_yield: list[int], types: list[str], abilities: list[tuple[str, bool]]):
+        self.name = name
+        self.species = species
+        self.base_stats = base_stats
+        self.ev_yield = ev_yield
+        self.types = types
+        self.abilities = abilities
+
+class SnapshotSpecies:
+    def __init__(self, id: int, name: str, egg_groups: list[str], evolution_chain_id: int, evolves_from: str, varieties: list[str]):
+        self.id = id
+        self.name = name
+        self.egg_groups = egg_groups
+        self.evolution_chain_id = evolution_chain_id
+        self.evolves_from = evolves_from
+        self.varieties = varieties
+
+class PokedexSnapshot:
+    """ In-memory view of a Pokedex snapshot file. All lookups are dictionary reads. """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = None
+        self.built_at = os.path.getmtime(path)
+        self.pokemon = {} # type: dict[str, SnapshotPokemon]
+        self.species = {} # type: dict[str, SnapshotSpecies]
+        self.abilities = {} # type: dict[str, str]
+        self.evolution_chains = {} # type: dict[int, list[str]]
+        self.egg_groups = {} # type: dict[str, list[str]]
+        self.load()
+
+    def load(self):
+        try:
+            connection = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+        except sqlite3.Error as e:
+            raise PokedexSnapshotException(f'Failed to open Pokedex snapshot {self.path}. Error: {e}')
+
+        try:
+            meta = dict(connection.execute('SELECT key, value FROM meta'))
+            self.version = int(meta.get('version', 0))
+            if self.version != SNAPSHOT_VERSION:
+                raise PokedexSnapshotException(f'Pokedex snapshot {self.path} has version {self.version}, expected {SNAPSHOT_VERSION}.')
+
+            for name, species, base_stats, ev_yield, types, abilities in connection.execute(
+                    'SELECT name, species, base_stats, ev_yield, types, abilities FROM pokemon'):
+                self.pokemon[name] = SnapshotPokemon(name, species, json.loads(base_stats), json.loads(ev_yield), json.loads(types),
+                    [tuple(ability) for ability in json.loads(abilities)])
+
+            for id, name, egg_groups, evolution_chain_id, evolves_from, varieties in connection.execute(
+                    'SELECT id, name, egg_groups, evolution_chain_id, evolves_from, varieties FROM species ORDER BY id'):
+                self.species[name] = SnapshotSpecies(id, name, json.loads(egg_groups), evolution_chain_id, evolves_from, json.loads(varieties))
+
+            self.abilities = dict(connection.execute('SELECT name, description FROM abilities'))
+            for id, species in connection.execute('SELECT id, species FROM evolution_chains'):
+                self.evolution_chains[id] = json.loads(species)
+        except sqlite3.Error as e:
+            raise PokedexSnapshotException(f'Failed to read Pokedex snapshot {self.path}. Error: {e}')
+        finally:
+            connection.close()
+
+        # Species are loaded in national dex order, so the egg group lists are too
+        for species in self.species.values():
+            for egg_group in species.egg_groups:
+                self.egg_groups.setdefault(egg_group, []).append(species.name)
+
+    def find_pokemon(self, name: str) -> SnapshotPokemon:
+        return self.pokemon.get(_normalize_name(name))
+
+    def find_species(self, name: str) -> SnapshotSpecies:
+        name = _normalize_name(name)
+        species = self.species.get(name)
+        if species is None and name in self.pokemon:
+            species = self.species.get(self.pokemon[name].species)
+        return species
+
+    def find_egg_group(self, name: str) -> list[str]:
+        name = _normalize_name(name)
+        return self.egg_groups.get(egg_group_aliases.get(name, name))
+
+    def find_ability_description(self, name: str) -> str:
+        return self.abilities.get(_normalize_name(name))
+
+_g_snapshot = None
+_g_snapshot_loaded = False
+_g_snapshot_lock = threading.Lock()
+
+def _normalize_name(name: str) -> str:
+    return name.strip().lower()
+
+def get_snapshot() -> PokedexSnapshot:
+    """
+    Returns the local Pokedex snapshot, loading it on first use.
+    The path is read from the POKEDEX_SNAPSHOT_PATH environment variable, falling back to scrapers/data/pokedex.sqlite.
+
+        Returns:
+            snapshot (PokedexSnapshot): The loaded snapshot, or None if no usable snapshot exists
+    """
+    global _g_snapshot, _g_snapshot_loaded
+    if _g_snapshot_loaded:
+        return _g_snapshot
+
+    with _g_snapshot_lock:
+        if not _g_snapshot_loaded:
+            path = os.environ.get('POKEDEX_SNAPSHOT_PATH', _default_snapshot_path)
+            if os.path.isfile(path):
+                try:
+                    _g_snapshot = PokedexSnapshot(path)
+                    print(f'Loaded Pokedex snapshot {path} with {len(_g_snapshot.pokemon)} pokemon.')
+                except PokedexSnapshotException as e:
+                    print(f'Failed to load Pokedex snapshot. Error: {e}')
+            else:
+                print(f'No Pokedex snapshot found at {path}. All lookups will use the network.')
+            _g_snapshot_loaded = True
+    return _g_snapshot
+
+def _read_csv(csv_dir: str, name: str) -> list[dict]:
+    with open(os.path.join(csv_dir, f'{name}.csv'), newline='', encoding='utf-8') as csv_file:
+        return list(csv.DictReader(csv_file))
+
+def build_snapshot(csv_dir: str, path: str):
+    """
+    Builds a Pokedex snapshot file from the CSV files of a PokeAPI data dump (pokeapi/data/v2/csv).
+
+        Parameters:
+            csv_dir (str): Directory containing the PokeAPI CSV files
+            path (str): Output path of the snapshot file. Any existing file is replaced.
+    """
+    types = {row['id']: row['identifier'] for row in _read_csv(csv_dir, 'types')}
+    egg_groups = {row['id']: row['identifier'] for row in _read_csv(csv_dir, 'egg_groups')}
+    abilities = {row['id']: row['identifier'] for row in _read_csv(csv_dir, 'abilities')}
+    species_rows = {row['id']: row for row in _read_csv(csv_dir, 'pokemon_species')}
+    pokemon_rows = {row['id']: row for row in _read_csv(csv_dir, 'pokemon')}
+
+    ability_descriptions = {abilities[row['ability_id']]: row['short_effect']
+        for row in _read_csv(csv_dir, 'ability_prose') if row['local_language_id'] == _english_language_id and row['ability_id'] in abilities}
+
+    stats = {pokemon_id: ([0] * 6, [0] * 6) for pokemon_id in pokemon_rows}
+    for row in _read_csv(csv_dir, 'pokemon_stats'):
+        stat_idx = int(row['stat_id']) - 1
+        if row['pokemon_id'] in stats and 0 <= stat_idx < 6:
+            stats[row['pokemon_id']][0][stat_idx] = int(row['base_stat'])
+            stats[row['pokemon_id']][1][stat_idx] = int(row['effort'])
+
+    pokemon_types = {pokemon_id: [] for pokemon_id in pokemon_rows}
+    for row in sorted(_read_csv(csv_dir, 'pokemon_types'), key=lambda r: int(r['slot'])):
+        if row['pokemon_id'] in pokemon_types:
+            pokemon_types[row['pokemon_id']].append(types[row['type_id']])
+
+    pokemon_abilities = {pokemon_id: [] for pokemon_id in pokemon_rows}
+    for row in sorted(_read_csv(csv_dir, 'pokemon_abilities'), key=lambda r: int(r['slot'])):
+        if row['pokemon_id'] in pokemon_abilities:
+            pokemon_abilities[row['pokemon_id']].append((abilities[row['ability_id']], row['is_hidden'] == '1'))
+
+    species_egg_groups = {species_id: [] for species_id in species_rows}
+    for row in _read_csv(csv_dir, 'pokemon_egg_groups'):
+        if row['species_id'] in species_egg_groups:
+            species_egg_groups[row['species_id']].append(egg_groups[row['egg_group_id']])
+
+    # Default variety first, to match the PokeAPI species ordering
+    species_varieties = {species_id: [] for species_id in species_rows}
+    for row in sorted(pokemon_rows.values(), key=lambda r: (r['is_default'] != '1', int(r['id']))):
+        species_varieties[row['species_id']].append(row['identifier'])
+
+    # Walk every evolution chain depth first from its base species, the same order as the PokeAPI chain tree
+    children = {species_id: [] for species_id in species_rows}
+    for row in species_rows.values():
+        if row['evolves_from_species_id']:
+            children[row['evolves_from_species_id']].append(row['id'])
+    chains = {}
+    def walk_chain(species_id: str, chain: list[str]):
+        chain.append(species_rows[species_id]['identifier'])
+        for child_id in sorted(children[species_id], key=lambda s: int(species_rows[s]['order'] or species_rows[s]['id'])):
+            walk_chain(child_id, chain)
+    for row in species_rows.values():
+        if not row['evolves_from_species_id'] and row['evolution_chain_id']:
+            walk_chain(row['id'], chains.setdefault(int(row['evolution_chain_id']), []))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.executescript('''
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE pokemon (name TEXT PRIMARY KEY, species TEXT, base_stats TEXT, ev_yield TEXT, types TEXT, abilities TEXT);
+            CREATE TABLE species (id INTEGER PRIMARY KEY, name TEXT UNIQUE, egg_groups TEXT, evolution_chain_id INTEGER, evolves_from TEXT, varieties TEXT);
+            CREATE TABLE abilities (name TEXT PRIMARY KEY, description TEXT);
+            CREATE TABLE evolution_chains (id INTEGER PRIMARY KEY, species TEXT);
+        ''')
+        connection.executemany('INSERT INTO meta VALUES (?, ?)', [('version', str(SNAPSHOT_VERSION)), ('source', os.path.abspath(csv_dir))])
+        connection.executemany('INSERT INTO pokemon VALUES (?, ?, ?, ?, ?, ?)', [
+            (row['identifier'], species_rows[row['species_id']]['identifier'], json.dumps(stats[pokemon_id][0]), json.dumps(stats[pokemon_id][1]),
+                json.dumps(pokemon_types[pokemon_id]), json.dumps(pokemon_abilities[pokemon_id]))
+            for pokemon_id, row in pokemon_rows.items() if row['species_id'] in species_rows
+        ])
+        connection.executemany('INSERT INTO species VALUES (?, ?, ?, ?, ?, ?)', [
+            (int(species_id), row['identifier'], json.dumps(species_egg_groups[species_id]), int(row['evolution_chain_id'] or 0),
+                species_rows[row['evolves_from_species_id']]['identifier'] if row['evolves_from_species_id'] else None, json.dumps(species_varieties[species_id]))
+            for species_id, row in species_rows.items()
+        ])
+        connection.executemany('INSERT INTO abilities VALUES (?, ?)', [(name, ability_descriptions.get(name, '')) for name in abilities.values()])
+        connection.executemany('INSERT INTO evolution_chains VALUES (?, ?)', [(id, json.dumps(chain)) for id, chain in chains.items()])
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, path)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build a local Pokedex snapshot from a PokeAPI CSV data dump.')
+    parser.add_argument('csv_dir', help='Directory containing the PokeAPI CSV files (pokeapi/data/v2/csv).')
+    parser.add_argument('output', nargs='?', default=os.environ.get('POKEDEX_SNAPSHOT_PATH', _default_snapshot_path),
+        help='Output path of the snapshot file.')
+    args = parser.parse_args()
+    build_snapshot(args.csv_dir, args.output)
+    print(f'Wrote Pokedex snapshot to {args.output}.')
@@ -0,0 +1,193 @@
+import functools
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+
+from data.pokemon_list import all_pokemon
+from data.egg_group_list import all_egg_groups
+from data.nature_list import all_natures
+from scrapers.snapshot import egg_group_aliases, get_snapshot
+
+_candidate_count = 24
+# Only names this close to a known one are treated as typos, newer pokemon missing from the lists still reach the upstream
+_screen_cutoff = 0.75
+
+def _normalize(name: str) -> str:
+    # Case and accent insensitive, ignoring punctuation and spacing ("Mr. Mime" == "mr-mime", "Flabébé" == "flabebe")
+    name = unicodedata.normalize('NFKD', name.casefold().replace('♀', 'f').replace('♂', 'm'))
+    return ''.join(c for c in name if c.isalnum())
+
+def _trigrams(normalized: str) -> set[str]:
+    padded = f'  {normalized} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class SuggestionIndex:
+    """
+    Trigram index over a list of names for ranked "Did you mean" suggestions.
+    Candidates sharing the most trigrams with the query are scored with difflib, so only a handful of names are ever compared.
+    """
+
+    def __init__(self, names: list[str]):
+        self.names = []
+        self.__normalized = [] # type: list[str]
+        self.__exact = {} # type: dict[str, int]
+        self.__trigrams = {} # type: dict[str, list[int]]
+        for name in names:
+            normalized = _normalize(name)
+            if not normalized or normalized in self.__exact:
+                continue
+            idx = len(self.names)
+            self.names.append(name)
+            self.__normalized.append(normalized)
+            self.__exact[normalized] = idx
+            for trigram in _trigrams(normalized):
+                self.__trigrams.setdefault(trigram, []).append(idx)
+
+    def __contains__(self, name: str) -> bool:
+        return _normalize(name) in self.__exact
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def find(self, name: str) -> str:
+        """ Returns the indexed spelling of name, or None if it isn't in the index. """
+        idx = self.__exact.get(_normalize(name))
+        return self.names[idx] if idx is not None else None
+
+    def suggest(self, name: str, n: int = 3, cutoff: float = 0.6) -> list[str]:
+        """
+        Looks up the names closest to the input name.
+
+            Parameters:
+                name (str): The misspelled name
+                n (int): Maximum number of suggestions to return
+                cutoff (float): Minimum similarity in the range [0, 1] for a name to be suggested
+
+            Returns:
+                suggestions (list[str]): Up to n names, best match first
+        """
+        normalized = _normalize(name)
+        if not normalized:
+            return []
+        idx = self.__exact.get(normalized)
+        if idx is not None:
+            return [self.names[idx]]
+
+        shared = {} # type: dict[int, int]
+        for trigram in _trigrams(normalized):
+            for candidate in self.__trigrams.get(trigram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:_candidate_count]
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(normalized)
+        scored = []
+        for candidate in candidates:
+            matcher.set_seq1(self.__normalized[candidate])
+            if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+                score = matcher.ratio()
+                if score >= cutoff:
+                    scored.append((score, candidate))
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [self.names[candidate] for _score, candidate in scored[:n]]
+
+_g_indexes = {} # type: dict[str, SuggestionIndex]
+_g_indexes_lock = threading.Lock()
+
+def _get_index(key: str, names_fn) -> SuggestionIndex:
+    index = _g_indexes.get(key)
+    if index is None:
+        with _g_indexes_lock:
+            index = _g_indexes.get(key)
+            if index is None:
+                index = SuggestionIndex(names_fn())
+                _g_indexes[key] = index
+    return index
+
+def _get_form_names() -> list[str]:
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return []
+    return ['-'.join([n.capitalize() for n in name.split('-')]) for name in snapshot.pokemon]
+
+def get_pokemon_index() -> SuggestionIndex:
+    return _get_index('pokemon', lambda: all_pokemon)
+
+def get_form_index() -> SuggestionIndex:
+    """ Index of every pokemon variety in the local snapshot (e.g. "Rotom-Wash"). Empty without a snapshot. """
+    return _get_index('forms', _get_form_names)
+
+def get_egg_group_name_index() -> SuggestionIndex:
+    return _get_index('egg_groups', lambda: all_egg_groups)
+
+def get_nature_index() -> SuggestionIndex:
+    return _get_index('natures', lambda: all_natures)
+
+def get_egg_group_alias_index() -> SuggestionIndex:
+    """ Index of the PokeAPI egg group identifiers and their user facing aliases, for recognising names the suggestion index doesn't list. """
+    return _get_index('egg_group_aliases', lambda: list(egg_group_aliases) + list(egg_group_aliases.values()))
+
+# Typos tend to be repeated, so the ranked suggestions of recent names are kept
+@functools.lru_cache(maxsize=1024)
+def _suggest_pokemon(name: str, n: int) -> tuple[str]:
+    form = get_form_index().find(name)
+    if form is not None:
+        return (form,)
+    suggestions = get_pokemon_index().suggest(name, n)
+    if len(suggestions) < n:
+        suggestions += [form for form in get_form_index().suggest(name, n) if form not in suggestions][:n - len(suggestions)]
+    return tuple(suggestions)
+
+@functools.lru_cache(maxsize=256)
+def _suggest_egg_group(name: str, n: int) -> tuple[str]:
+    return tuple(get_egg_group_name_index().suggest(name, n))
+
+def suggest_pokemon(name: str, n: int = 3) -> list[str]:
+    """ Suggests pokemon species names, then form names, similar to the input name. """
+    return list(_suggest_pokemon(name, n))
+
+def suggest_egg_group(name: str, n: int = 3) -> list[str]:
+    return list(_suggest_egg_group(name, n))
+
+def suggest_nature(name: str, n: int = 3) -> list[str]:
+    return get_nature_index().suggest(name, n)
+
+def _is_known_pokemon(name: str) -> bool:
+    if name in get_pokemon_index() or name in get_form_index():
+        return True
+    snapshot = get_snapshot()
+    if snapshot is not None and snapshot.find_species(name) is not None:
+        return True
+    # Forms missing from the local lists ("rotom-wash", "charizard-mega-x") are known if their species is
+    parts = name.split('-')
+    return any('-'.join(parts[:i]) in get_pokemon_index() for i in range(len(parts) - 1, 0, -1))
+
+def _is_known_egg_group(name: str) -> bool:
+    if name in get_egg_group_name_index() or name in get_egg_group_alias_index():
+        return True
+    snapshot = get_snapshot()
+    return snapshot is not None and snapshot.find_egg_group(name) is not None
+
+def screen_pokemon(name: str) -> list[str]:
+    """
+    Checks a pokemon name against the local indexes, so typos are answered without a network call.
+
+        Parameters:
+            name (str): The pokemon name to check
+
+        Returns:
+            suggestions (list[str]): The names to suggest if name is unknown locally and a close typo of a known pokemon.
+                None if the name is known, if it isn't close enough to anything local, or if no snapshot is loaded, and only the upstream can tell.
+    """
+    # Without a snapshot the name lists miss every newer pokemon, so a near miss may well be real ("Wiglett" vs "Diglett")
+    if get_snapshot() is None or _is_known_pokemon(name):
+        return None
+    if not get_pokemon_index().suggest(name, 1, _screen_cutoff) and not get_form_index().suggest(name, 1, _screen_cutoff):
+        return None
+    return suggest_pokemon(name)
+
+def screen_egg_group(name: str) -> list[str]:
+    """ Checks an egg group name against the local indexes. See screen_pokemon. """
+    if get_snapshot() is None or _is_known_egg_group(name) or not get_egg_group_name_index().suggest(name, 1, _screen_cutoff):
+        return None
+    return suggest_egg_group(name)
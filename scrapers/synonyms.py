@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import scrapers
+from scrapers.cache import MemoryCache
+
+_default_store_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'synonyms.sqlite')
+_default_memory_entries = 4096
+_default_hit_ttl = 30 * 24 * 60 * 60
+_default_miss_ttl = 24 * 60 * 60
+# Dataset rows never expire, they are only replaced by loading a newer dataset
+_dataset_expires_at = float('inf')
+# Open thesaurus datasets list hundreds of related words for common roots, more than fits in one reply
+_max_dataset_synonyms = 100
+# Seconds a store query waits for another process to release the database before failing
+_busy_timeout = 2.0
+
+SOURCE_WEB = 'web'
+SOURCE_DATASET = 'dataset'
+
+class SynonymStoreException(scrapers.ScraperException):
+    """ Base exception class for this module. """
+    pass
+
+def _normalize_word(word: str) -> str:
+    # The synonym command joins multi word lookups with '+'
+    return ' '.join(word.replace('+', ' ').casefold().split())
+
+class SynonymStore:
+    """
+    Persistent synonym lookups keyed by word, with a memory LRU in front.
+    Hits hold the synonyms of a word, misses hold the spelling suggestions given for a word the thesaurus doesn't know.
+    Entries are stored as get_synonym results, (found, words).
+    """
+
+    def __init__(self, path: str, memory_entries: int):
+        self.path = path
+        self.__memory = MemoryCache(memory_entries, 0)
+        self.__lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        try:
+            self.__connection = sqlite3.connect(path, timeout=_busy_timeout, check_same_thread=False)
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS synonyms (word TEXT PRIMARY KEY, found INTEGER, words TEXT, source TEXT, expires_at REAL)')
+            self.__connection.commit()
+        except sqlite3.Error as e:
+            raise SynonymStoreException(f'Failed to open synonym store {path}. Error: {e}')
+
+    def get(self, word: str) -> tuple[bool, list[str]]:
+        """ Returns the stored (found, words) of word, or None if it isn't stored or has expired. """
+        word = _normalize_word(word)
+        found, entry, _expires_at = self.__memory.get(word)
+        if found:
+            return entry
+
+        try:
+            with self.__lock:
+                row = self.__connection.execute('SELECT found, words, expires_at FROM synonyms WHERE word = ?', (word,)).fetchone()
+            if row is None or row[2] < time.time():
+                return None
+            entry = (bool(row[0]), json.loads(row[1]))
+        except (sqlite3.Error, ValueError) as e:
+            # A locked or corrupt store falls through to the thesaurus
+            print(f'Failed to read synonym store entry {word}, treating it as a miss. Error: {e}')
+            return None
+        self.__memory.set(word, entry, row[2])
+        return entry
+
+    def set(self, word: str, found: bool, words: list[str]):
+        """ Records a thesaurus.com answer: its synonyms if found is True, otherwise its spelling suggestions. """
+        word = _normalize_word(word)
+        ttl = scrapers.get_env_int('SCRAPER_SYNONYM_TTL', _default_hit_ttl) if found else scrapers.get_env_int('SCRAPER_SYNONYM_MISS_TTL', _default_miss_ttl)
+        expires_at = time.time() + ttl
+        with self.__lock:
+            try:
+                self.__connection.execute('INSERT OR REPLACE INTO synonyms VALUES (?, ?, ?, ?, ?)', (word, int(found), json.dumps(words), SOURCE_WEB, expires_at))
+                self.__connection.commit()
+            except sqlite3.Error as e:
+                try:
+                    self.__connection.rollback()
+                except sqlite3.Error:
+                    pass
+                print(f'Failed to write synonym store entry {word}, skipping it. Error: {e}')
+        self.__memory.set(word, (found, list(words)), expires_at)
+
+    def load_dataset(self, path: str) -> int:
+        """
+        Prefills the store from an open thesaurus dataset with one entry per line: the word, then its synonyms, comma separated.
+        This is the format of the Moby thesaurus (mthesaur.txt). Existing entries for the same words are replaced.
+
+            Parameters:
+                path (str): Path of the dataset file
+
+            Returns:
+                count (int): Number of words loaded
+        """
+        rows = []
+        with open(path, encoding='utf-8', errors='replace') as dataset:
+            for line in dataset:
+                words = [word.strip() for word in line.split(',') if word.strip()]
+                if len(words) < 2:
+                    continue
+                rows.append((_normalize_word(words[0]), 1, json.dumps(words[1:_max_dataset_synonyms + 1]), SOURCE_DATASET, _dataset_expires_at))
+        with self.__lock:
+            self.__connection.executemany('INSERT OR REPLACE INTO synonyms VALUES (?, ?, ?, ?, ?)', rows)
+            self.__connection.commit()
+        self.__memory.clear()
+        return len(rows)
+
+_g_store = None
+_g_store_loaded = False
+_g_store_lock = threading.Lock()
+
+def get_synonym_store() -> SynonymStore:
+    """
+    Returns the synonym store, opening it on first use.
+    Configured with the SCRAPER_SYNONYM_STORE_PATH and SCRAPER_SYNONYM_MEMORY_ENTRIES environment variables.
+
+        Returns:
+            store (SynonymStore): The store, or None if it can't be opened
+    """
+    global _g_store, _g_store_loaded
+    if not _g_store_loaded:
+        with _g_store_lock:
+            if not _g_store_loaded:
+                path = os.environ.get('SCRAPER_SYNONYM_STORE_PATH', _default_store_path)
+                try:
+                    _g_store = SynonymStore(path, scrapers.get_env_int('SCRAPER_SYNONYM_MEMORY_ENTRIES', _default_memory_entries))
+                except SynonymStoreException as e:
+                    print(f'{e} All synonym lookups will use the network.')
+                _g_store_loaded = True
+    return _g_store
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prefill the synonym store from an open thesaurus dataset.')
+    parser.add_argument('dataset', help='Dataset file with one "word,synonym,synonym,..." entry per line, such as the Moby thesaurus.')
+    parser.add_argument('output', nargs='?', default=os.environ.get('SCRAPER_SYNONYM_STORE_PATH', _default_store_path),
+        help='Path of the synonym store.')
+    args = parser.parse_args()
+    count = SynonymStore(args.output, 0).load_dataset(args.dataset)
+    print(f'Loaded {count} words into {args.output}.')
@@ -1,10 +1,34 @@
+import re
 import requests
-from bs4 import BeautifulSoup
-from PyDictionary import PyDictionary
+import threading
+from lxml import etree
 
 import scrapers
+import scrapers.session
+from scrapers.cache import cached
+from scrapers.executor import awaitable
+from scrapers.singleflight import coalesce
+from scrapers.ratelimit import rate_limited
+from scrapers.synonyms import get_synonym_store
+from scrapers.dictionary import get_dictionary
 
-dictionary = PyDictionary()
+_g_remote_dictionary = None
+_g_remote_dictionary_lock = threading.Lock()
+
+# XPath queries for the parts of the browse page we read
+_xpath_meanings = etree.XPath('//div[@id = "meanings"][1]')
+_xpath_word_grid = etree.XPath('//div[@data-testid = "word-grid-container"][1]')
+_xpath_spell_suggestions = etree.XPath('//div[contains(concat(" ", normalize-space(@class), " "), " spell-suggestions ")][1]')
+_xpath_links = etree.XPath('.//a')
+_xpath_antonym_word_grid = etree.XPath('//div[@id = "antonyms"]//div[@data-testid = "word-grid-container"][1]')
+_xpath_meaning_tabs = etree.XPath('//div[@id = "meanings"]//li[.//strong][not(ancestor::div[@data-testid = "word-grid-container"])]')
+_xpath_tab_part_of_speech = etree.XPath('.//em[1]')
+_xpath_tab_meaning = etree.XPath('.//strong[1]')
+
+_strength_label = re.compile(r'^\s*(strongest|strong|weak)\s+match(?:es)?\s*$', re.IGNORECASE)
+
+def _get_text(element) -> str:
+    return ''.join(text.strip() for text in element.itertext())
 
 class ThesaurusScraperException(scrapers.ScraperException):
     """ Base exception class for this module. """
@@ -18,27 +42,48 @@ class WebParseException(ThesaurusScraperException, scrapers.ParseException):
     """ An error occurred during webpage parsing. Inherits from ThesaurusScraperException. """
     pass
 
-def get_synonym(word: str) -> tuple[bool, list[str]]:
-    """
-    Looks up the synonym to a word using https://www.thesaurus.com/browse. 
-    Either returns synonyms, or suggestions for words that are similar if that word wasn't found.
+class SynonymGroup:
+    """ Synonyms of one meaning of a word. Strength is thesaurus.com's match label ('Strongest', 'Strong', 'Weak'), or None if the page doesn't rank them. """
 
-        Parameters:
-            word (str): A word to lookup the synonym for
-        
-        Returns:
-            (success, result_list) (tuple[bool, list[str]]):
-                - success of True indicates that synonyms were found, and the result_list is a list of synonyms
-                - success of False indicates that the word didn't match anything in the thesaurus, and the result_list is a list of suggested words
+    def __init__(self, part_of_speech: str, meaning: str, strength: str, words: list[str]):
+        self.part_of_speech = part_of_speech
+        self.meaning = meaning
+        self.strength = strength
+        self.words = words
 
-        Exceptions:
-            Throws:
-                - WebRequestException
-                - WebParseException
-    """
-    # Pull the webpage
-    url = f'https://www.thesaurus.com/browse/{word}'
-    response = requests.get(url)
+class ThesaurusEntry:
+    """ Everything read from one thesaurus.com page. A word the thesaurus doesn't know has found set to False and only suggestions filled in. """
+
+    def __init__(self, word: str, found: bool, synonym_groups: list[SynonymGroup], antonyms: list[str], related: list[str], suggestions: list[str]):
+        self.word = word
+        self.found = found
+        self.synonym_groups = synonym_groups
+        self.antonyms = antonyms
+        self.related = related
+        self.suggestions = suggestions
+
+    @property
+    def synonyms(self) -> list[str]:
+        return [word for group in self.synonym_groups for word in group.words]
+
+def _parse_strength(element) -> str:
+    # Ranked grids put a "Strongest matches" / "Strong matches" / "Weak matches" label before each list of links
+    if len(element) > 0 or element.tag == 'a':
+        return None
+    match = _strength_label.match(_get_text(element))
+    return match.group(1).capitalize() if match else None
+
+def _parse_synonym_groups(container, part_of_speech: str, meaning: str) -> list[SynonymGroup]:
+    groups = [SynonymGroup(part_of_speech, meaning, None, [])]
+    for element in container.iter(tag=etree.Element):
+        strength = _parse_strength(element)
+        if strength is not None:
+            groups.append(SynonymGroup(part_of_speech, meaning, strength, []))
+        elif element.tag == 'a':
+            groups[-1].words.append(_get_text(element))
+    return [group for group in groups if group.words]
+
+def _parse_thesaurus_page(word: str, response) -> ThesaurusEntry:
     if response.status_code == 404 and response.text is not None:
         # 404 gives useful information, so we still want to parse it
         pass
@@ -46,44 +91,192 @@ def get_synonym(word: str) -> tuple[bool, list[str]]:
         try:
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
-            raise WebRequestException(f'Failed to GET request to URL {url}. Error: {e}')
+            raise WebRequestException(f'Failed to GET request to URL {response.url}. Error: {e}')
 
     try:
-        soup = BeautifulSoup(response.text, 'lxml')
+        tree = scrapers.session.parse_html(response)
     except Exception as e:
         raise WebParseException(f'Failed to parse response using lxml. Error: {e}')
 
     # Search for synonyms
     try:
         # Parse meanings id
-        meanings = soup.find('div', {'id': 'meanings'})
-        if meanings is None:
+        if len(_xpath_meanings(tree)) == 0:
             raise WebParseException('Failed to parse "id" of "meanings" from webpage.')
 
         # Parse container
-        container = soup.find('div', {'data-testid': 'word-grid-container'})
-        if container is None:
+        container = _xpath_word_grid(tree)
+        if len(container) == 0:
             raise WebParseException('Failed to parse "data-testid" of "word-grid-container" from meanings.')
-
-        # Get synonyms
-        synonyms = [span.get_text(strip=True) for span in container.find_all('a')]
-        return (True, synonyms)
     except WebParseException as syn_err:
         # Search for suggestions
         try:
             # Parse spell suggestions div
-            spell_sug = soup.find('div', {'class': 'spell-suggestions'})
-            if spell_sug is None:
+            spell_sug = _xpath_spell_suggestions(tree)
+            if len(spell_sug) == 0:
                 raise WebParseException('Failed to parse "class" of "spell-suggestions" from webpage.')
             
             # Parse out all suggestions
-            suggestions = [span.get_text(strip=True) for span in spell_sug.find_all('a')]
-            return (False, suggestions)
+            suggestions = [_get_text(a) for a in _xpath_links(spell_sug[0])]
+            return ThesaurusEntry(word, False, [], [], [], suggestions)
         except WebParseException as sug_err:
             raise WebParseException(f'Failed to parse the webpage. Synonym parse error: {syn_err} Suggestion parse error: {sug_err}')
 
+    # The meaning tabs are optional, the first one is the meaning the word grid lists synonyms of
+    meanings = []
+    for tab in _xpath_meaning_tabs(tree):
+        part_of_speech, meaning = _xpath_tab_part_of_speech(tab), _xpath_tab_meaning(tab)
+        meanings.append((_get_text(part_of_speech[0]) if part_of_speech else None, _get_text(meaning[0])))
+    part_of_speech, meaning = meanings[0] if meanings else (None, None)
+    synonym_groups = _parse_synonym_groups(container[0], part_of_speech, meaning)
+
+    # Antonyms have their own word grid, which not every word has
+    antonym_container = _xpath_antonym_word_grid(tree)
+    antonyms = [_get_text(a) for a in _xpath_links(antonym_container[0])] if antonym_container else []
+
+    # The other meanings are labelled by their closest words, which make up the related words
+    known = {word.casefold()} | {synonym.casefold() for group in synonym_groups for synonym in group.words}
+    related = []
+    for _part_of_speech, label in meanings[1:]:
+        for related_word in (w.strip() for w in label.split(',')):
+            if related_word and related_word.casefold() not in known:
+                known.add(related_word.casefold())
+                related.append(related_word)
+    return ThesaurusEntry(word, True, synonym_groups, antonyms, related, [])
+
+@cached('thesaurus.entry')
+def get_thesaurus_entry(word: str) -> ThesaurusEntry:
+    """
+    Looks up a word using https://www.thesaurus.com/browse, reading its synonyms, antonyms, related words and spelling suggestions from the one page.
+
+        Parameters:
+            word (str): A word to lookup, with multiple words joined by '+'
+
+        Returns:
+            entry (ThesaurusEntry): Every section of the page. Sections the page doesn't have are empty lists.
+
+        Exceptions:
+            Throws:
+                - WebRequestException
+                - WebParseException
+    """
+    # Pull the webpage. Unchanged pages are answered 304 by thesaurus.com, and the stored parse result is reused.
+    url = f'https://www.thesaurus.com/browse/{word}'
+    try:
+        return scrapers.session.get_revalidated(url, lambda response: _parse_thesaurus_page(word, response), 'thesaurus.entry')
+    except requests.exceptions.RequestException as e:
+        raise WebRequestException(f'Failed to GET request to URL {url}. Error: {e}')
+
+@coalesce('thesaurus.synonym')
+def get_synonym(word: str) -> tuple[bool, list[str]]:
+    """
+    Looks up the synonym to a word using https://www.thesaurus.com/browse. 
+    Either returns synonyms, or suggestions for words that are similar if that word wasn't found.
+
+        Parameters:
+            word (str): A word to lookup the synonym for
+        
+        Returns:
+            (success, result_list) (tuple[bool, list[str]]):
+                - success of True indicates that synonyms were found, and the result_list is a list of synonyms
+                - success of False indicates that the word didn't match anything in the thesaurus, and the result_list is a list of suggested words
+
+        Exceptions:
+            Throws:
+                - WebRequestException
+                - WebParseException
+    """
+    # Answered words, found or not, are kept in the synonym store
+    store = get_synonym_store()
+    result = store.get(word) if store is not None else None
+    if result is not None:
+        return result
+
+    entry = get_thesaurus_entry(word)
+    result = (True, entry.synonyms) if entry.found else (False, entry.suggestions)
+    if store is not None:
+        store.set(word, *result)
+    return result
+
+def get_antonym(word: str) -> tuple[bool, list[str]]:
+    """
+    Looks up the antonyms of a word, from the same cached page as its synonyms.
+
+        Parameters:
+            word (str): A word to lookup the antonyms for
+
+        Returns:
+            (success, result_list) (tuple[bool, list[str]]):
+                - success of True indicates that the word was found, and the result_list is a list of antonyms, which may be empty
+                - success of False indicates that the word didn't match anything in the thesaurus, and the result_list is a list of suggested words
+
+        Exceptions:
+            Throws:
+                - WebRequestException
+                - WebParseException
+    """
+    entry = get_thesaurus_entry(word)
+    return (True, entry.antonyms) if entry.found else (False, entry.suggestions)
+
+def get_related(word: str) -> tuple[bool, list[str]]:
+    """
+    Looks up words related to the other meanings of a word, from the same cached page as its synonyms.
+
+        Parameters:
+            word (str): A word to lookup the related words for
+
+        Returns:
+            (success, result_list) (tuple[bool, list[str]]):
+                - success of True indicates that the word was found, and the result_list is a list of related words, which may be empty
+                - success of False indicates that the word didn't match anything in the thesaurus, and the result_list is a list of suggested words
+
+        Exceptions:
+            Throws:
+                - WebRequestException
+                - WebParseException
+    """
+    entry = get_thesaurus_entry(word)
+    return (True, entry.related) if entry.found else (False, entry.suggestions)
+
+def _get_remote_dictionary():
+    # PyDictionary is slow to import and only needed when the local dictionary is missing a word
+    global _g_remote_dictionary
+    if _g_remote_dictionary is None:
+        with _g_remote_dictionary_lock:
+            if _g_remote_dictionary is None:
+                from PyDictionary import PyDictionary
+                _g_remote_dictionary = PyDictionary()
+    return _g_remote_dictionary
+
+@rate_limited('wordnetweb.princeton.edu')
+def _get_remote_definition(word: str) -> dict[list[str]]:
+    return _get_remote_dictionary().meaning(word, disable_errors=True)
+
+@coalesce('thesaurus.definition')
 def get_definition(word: str) -> dict[list[str]]:
-    meaning = dictionary.meaning(word, disable_errors=True)
+    """
+    Looks up the definitions of a word in the local dictionary, falling back to PyDictionary for words it doesn't have.
+
+        Parameters:
+            word (str): A word to define
+
+        Returns:
+            meaning (dict[str, list[str]]): Definitions keyed by part of speech ('Noun', 'Verb', 'Adjective', 'Adverb')
+
+        Exceptions:
+            Throws:
+                - WebRequestException
+    """
+    dictionary = get_dictionary()
+    meaning = dictionary.meaning(word) if dictionary is not None else None
+    if meaning is None:
+        meaning = _get_remote_definition(word)
     if meaning is None:
-        raise WebRequestException(f'Failed to find meaning for word {meaning}.')
+        raise WebRequestException(f'Failed to find meaning for word {word}.')
     return meaning
+
+# Awaitable versions of the lookups, run on the shared scraper thread pool
+get_synonym_async = awaitable(get_synonym)
+get_antonym_async = awaitable(get_antonym)
+get_related_async = awaitable(get_related)
+get_definition_async = awaitable(get_definition)
@@ -1,7 +1,10 @@
 from utility.pokemon import PokemonStats, PokemonStatsError, compute_stats, get_stat_range_str
 import scrapers
-import scrapers.pokebase as pokemondb
+import scrapers.pokedex as pokemondb
+from scrapers.suggestions import suggest_nature
+from scrapers.evolutions import get_evolution_graph
 import math
+import threading
 
 class PokemonTrackingException(Exception):
     pass
@@ -67,8 +70,15 @@ _berries_map = {
     'tamato': PokemonStats(speed=-10, min_val=-10),
 }
 
+def _get_nature(nature: str) -> PokemonStats:
+    try:
+        return _natures_map[nature.lower()]
+    except KeyError:
+        suggestions = suggest_nature(nature)
+        raise PokemonTrackingException(f'Nature {nature} does not exist.' + (f' Did you mean: {", ".join(suggestions)}?' if len(suggestions) > 0 else ''))
+
 class Pokemon:
-    def __init__(self, pokemon_name: str, nature: str, nickname = '', form_name = ''):
+    def __init__(self, pokemon_name: str, nature: str, nickname = '', form_name = '', resolve_base_stats = True):
         self._name = pokemon_name.capitalize()
         if not form_name:
             self._form_name = self._name
@@ -84,39 +94,66 @@ class Pokemon:
         self.evs = PokemonStats(max_val=252, max_total=510)
         self.ivs_min = PokemonStats(0, 0, 0, 0, 0, 0)
         self.ivs_max = PokemonStats(31, 31, 31, 31, 31, 31)
-        self.nature = _natures_map[self._nature_name.lower()]
-        try:
-            self.base_stats = pokemondb.get_base_stats(self._form_name)
-        except scrapers.SuggestionException as suggestions:
-            raise PokemonNotFoundException(f'Pokemon {self._name} was not found in the Pokedex. Did you mean: {suggestions}?')
+        self.nature = _get_nature(self._nature_name)
+
+        # Base stats are looked up on first use, unless the name needs validating now
+        self._base_stats = None
+        if resolve_base_stats:
+            self.base_stats
+
+    @property
+    def base_stats(self) -> PokemonStats:
+        if self._base_stats is None:
+            try:
+                self._base_stats = pokemondb.get_base_stats(self._form_name)
+            except scrapers.SuggestionException as suggestions:
+                raise PokemonNotFoundException(f'Pokemon {self._name} was not found in the Pokedex. Did you mean: {suggestions}?')
+        return self._base_stats
+
+    @base_stats.setter
+    def base_stats(self, base_stats: PokemonStats):
+        self._base_stats = base_stats
 
     @classmethod
     def from_dict(cls, in_dict: dict):
-        pokemon = cls(in_dict['name'], in_dict['nature'], in_dict['nickname'], in_dict.get('form_name', ''))
+        pokemon = cls(in_dict['name'], in_dict['nature'], in_dict['nickname'], in_dict.get('form_name', ''), resolve_base_stats=False)
         pokemon.evs = PokemonStats.from_dict({'.'.join(key.split('.')[1:]): int(float(val)) for key, val in in_dict.items() if ('evs.' in key) and (not math.isnan(val))}, max_val=252, max_total=510)
         pokemon.ivs_min = PokemonStats.from_dict({'.'.join(key.split('.')[1:]): int(float(val)) for key, val in in_dict.items() if ('ivs_min.' in key) and (not math.isnan(val))})
         pokemon.ivs_max = PokemonStats.from_dict({'.'.join(key.split('.')[1:]): int(float(val)) for key, val in in_dict.items() if ('ivs_max.' in key) and (not math.isnan(val))})
         return pokemon
 
-    def change_evolution(self, new_name: str):
-        try:
-            evolutions = pokemondb.get_evolutions(self._name)
-        except scrapers.SuggestionException:
-            raise PokemonTrackingException(f'Pokemon {self._name} was not found in the Pokedex. It is possible the data has been corrupted.')
-
-        if new_name.lower() not in [e.lower() for e in evolutions]:
+    def resolve_evolution(self, new_name: str) -> tuple[str, PokemonStats]:
+        """ Looks up the name and base stats of an evolution of this pokemon, without changing it. See change_evolution. """
+        # Answer from the precomputed evolution graph when possible, the evolution list is only needed for the error message
+        graph = get_evolution_graph()
+        is_evolution = graph.is_evolution_of(new_name, self._name) if graph is not None else None
+        if is_evolution is not True:
+            try:
+                evolutions = pokemondb.get_evolutions(self._name)
+            except scrapers.SuggestionException:
+                raise PokemonTrackingException(f'Pokemon {self._name} was not found in the Pokedex. It is possible the data has been corrupted.')
+            is_evolution = new_name.lower() in [e.lower() for e in evolutions]
+
+        if not is_evolution:
             raise PokemonNotFoundException(f'Pokemon {new_name} is not an evolution of {self._name}. ' +
                 f'All possible evolutions are: {", ".join(evolutions)}.' if len(evolutions) > 0 else f'There are no evolutions for {self._name}.')
         new_name = new_name.capitalize()
 
         try:
-            self.base_stats = pokemondb.get_base_stats(new_name)
+            return (new_name, pokemondb.get_base_stats(new_name))
         except scrapers.SuggestionException:
             raise PokemonTrackingException(f'Pokemon {new_name} was not found in the Pokedex but was found in evolution list. Weird.')
+
+    def change_evolution(self, new_name: str):
+        self.apply_evolution(*self.resolve_evolution(new_name))
+
+    def apply_evolution(self, new_name: str, base_stats: PokemonStats):
+        self.base_stats = base_stats
         self._name = new_name
         self._form_name = new_name
 
-    def change_form(self, new_name: str):
+    def resolve_form(self, new_name: str) -> tuple[str, PokemonStats]:
+        """ Looks up the name and base stats of a form of this pokemon, without changing it. See change_form. """
         try:
             forms = pokemondb.get_forms(self._name)
         except scrapers.SuggestionException:
@@ -128,9 +165,15 @@ class Pokemon:
         new_name = '-'.join([n.capitalize() for n in new_name.split('-')])
 
         try:
-            self.base_stats = pokemondb.get_base_stats(new_name)
+            return (new_name, pokemondb.get_base_stats(new_name))
         except scrapers.SuggestionException:
             raise PokemonTrackingException(f'Pokemon {new_name} was not found in the Pokedex but was found in forms list. Weird.')
+
+    def change_form(self, new_name: str):
+        self.apply_form(*self.resolve_form(new_name))
+
+    def apply_form(self, new_name: str, base_stats: PokemonStats):
+        self.base_stats = base_stats
         self._form_name = new_name
 
     def to_dict(self):
@@ -176,8 +219,8 @@ class Pokemon:
         self.evs.goal_stats = goal_evs
 
     def set_nature(self, nature):
+        self.nature = _get_nature(nature)
         self._nature_name = nature.capitalize()
-        self.nature = _natures_map[self._nature_name.lower()]
 
     def compute_stats_min_max(self, level):
         remaining_evs = 510 - self.evs.total
@@ -200,6 +243,8 @@ class Pokemon:
 class _PokemonTrackingBase:
     def __init__(self):
         self.pokemon = {} # type: dict[str, list[Pokemon]]
+        # Held while the tracked pokemon are modified and saved. Pokedex lookups happen before taking it, so one user's slow lookup never holds up another's command.
+        self.state_lock = threading.RLock()
         self.load_state()
 
     def load_state(self):
@@ -208,6 +253,24 @@ class _PokemonTrackingBase:
     def save_state(self):
         raise NotImplementedError('Method "save_state" has not been implemented.')
 
+    def start_prefetch(self):
+        """ Starts looking up the base stats of every loaded pokemon in the background. They're resolved lazily otherwise, so this only warms them up. """
+        threading.Thread(target=self.prefetch_base_stats, name='base-stats-prefetch', daemon=True).start()
+
+    def prefetch_base_stats(self):
+        with self.state_lock:
+            pokemon_list = [(pokemon, pokemon._form_name) for user_pokemon in self.pokemon.values() for pokemon in user_pokemon]
+        results = pokemondb.get_base_stats_many([form_name for _pokemon, form_name in pokemon_list])
+        for (pokemon, form_name), (_name, base_stats, error) in zip(pokemon_list, results):
+            if error is not None:
+                print(f'Failed to prefetch base stats for {pokemon.get_name()}. Error: {error}')
+                continue
+            with self.state_lock:
+                # Evolving or changing form during the lookup sets the new stats, which must not be overwritten with the old form's
+                if pokemon._base_stats is None and pokemon._form_name == form_name:
+                    pokemon.base_stats = base_stats
+        print(f'Prefetched base stats for {len(pokemon_list) - len(results.failed())} of {len(pokemon_list)} tracked pokemon.')
+
     def to_dict(self):
         return {(user, i): self.pokemon[user][i].to_dict() for user in self.pokemon for i in range(len(self.pokemon[user]))}
 
@@ -223,31 +286,37 @@ class _PokemonTrackingBase:
         return f'{pokemon_id}: {self.pokemon[user][pokemon_id].get_name()}'
 
     def add_pokemon_obj(self, user, pokemon: Pokemon, idx = 0xFFFFFFFF) -> int:
-        if user not in self.pokemon:
-            self.pokemon[user] = []
-        self.pokemon[user].insert(idx, pokemon)
-        self.save_state()
-        return len(self.pokemon[user]) - 1 if idx >= len(self.pokemon[user]) else idx
+        with self.state_lock:
+            if user not in self.pokemon:
+                self.pokemon[user] = []
+            self.pokemon[user].insert(idx, pokemon)
+            self.save_state()
+            return len(self.pokemon[user]) - 1 if idx >= len(self.pokemon[user]) else idx
 
     def add_pokemon(self, user, pokemon_name, nature, nickname = '', idx = 0xFFFFFFFF) -> int:
-        return self.add_pokemon_obj(user, Pokemon(pokemon_name, nature, nickname), idx)
+        # Validating the name looks up its base stats, so the pokemon is created before the state lock is taken
+        pokemon = Pokemon(pokemon_name, nature, nickname)
+        return self.add_pokemon_obj(user, pokemon, idx)
 
     def add_pokemon_obj_str(self, user, pokemon: Pokemon, idx = 0xFFFFFFFF) -> str:
-        self.add_pokemon_obj(user, pokemon, idx)
-        return self.get_all_pokemon(user)
+        with self.state_lock:
+            self.add_pokemon_obj(user, pokemon, idx)
+            return self.get_all_pokemon(user)
 
     def remove_pokemon(self, user, pokemon_id) -> Pokemon:
-        self.__check_user(user)
-        self.__check_pokemon_id(user, pokemon_id)
-        pokemon = self.pokemon[user].pop(pokemon_id)
-        if len(self.pokemon[user]) == 0:
-            del self.pokemon[user]
-        self.save_state()
-        return pokemon
+        with self.state_lock:
+            self.__check_user(user)
+            self.__check_pokemon_id(user, pokemon_id)
+            pokemon = self.pokemon[user].pop(pokemon_id)
+            if len(self.pokemon[user]) == 0:
+                del self.pokemon[user]
+            self.save_state()
+            return pokemon
 
     def remove_pokemon_str(self, user, pokemon_id) -> str:
-        self.remove_pokemon(user, pokemon_id)
-        return self.get_all_pokemon(user)
+        with self.state_lock:
+            self.remove_pokemon(user, pokemon_id)
+            return self.get_all_pokemon(user)
 
     def get_all_pokemon(self, user) -> str:
         self.__check_user(user)
@@ -285,12 +354,13 @@ class _PokemonTrackingBase:
             for i in range(len(self.pokemon[user]))])
 
     def set_evs(self, user, pokemon_id, hp, attack, defense, sp_atk, sp_def, speed) -> PokemonStats:
-        self.__check_user(user)
-        self.__check_pokemon_id(user, pokemon_id)
-        evs = PokemonStats(hp, attack, defense, sp_atk, sp_def, speed)
-        self.pokemon[user][pokemon_id].set_evs(evs)
-        self.save_state()
-        return self.pokemon[user][pokemon_id].evs
+        with self.state_lock:
+            self.__check_user(user)
+            self.__check_pokemon_id(user, pokemon_id)
+            evs = PokemonStats(hp, attack, defense, sp_atk, sp_def, speed)
+            self.pokemon[user][pokemon_id].set_evs(evs)
+            self.save_state()
+            return self.pokemon[user][pokemon_id].evs
 
     def set_evs_str(self, user, pokemon_id, hp, attack, defense, sp_atk, sp_def, speed) -> str:
         evs = self.set_evs(user, pokemon_id, hp, attack, defense, sp_atk, sp_def, speed)
@@ -305,41 +375,44 @@ class _PokemonTrackingBase:
         return f'**{self.get_full_name_str(user, pokemon_id)}: Goal EVs**\n{self.get_goal_evs(user, pokemon_id)}'
 
     def set_goal_evs(self, user, pokemon_id, hp, attack, defense, sp_atk, sp_def, speed) -> PokemonStats:
-        self.__check_user(user)
-        self.__check_pokemon_id(user, pokemon_id)
-        goal_evs = PokemonStats(hp, attack, defense, sp_atk, sp_def, speed)
-        self.pokemon[user][pokemon_id].set_goal_evs(goal_evs)
-        self.save_state()
-        return self.pokemon[user][pokemon_id].evs.goal_stats
+        with self.state_lock:
+            self.__check_user(user)
+            self.__check_pokemon_id(user, pokemon_id)
+            goal_evs = PokemonStats(hp, attack, defense, sp_atk, sp_def, speed)
+            self.pokemon[user][pokemon_id].set_goal_evs(goal_evs)
+            self.save_state()
+            return self.pokemon[user][pokemon_id].evs.goal_stats
 
     def set_goal_evs_str(self, user, pokemon_id, hp, attack, defense, sp_atk, sp_def, speed) -> str:
         goal_evs = self.set_goal_evs(user, pokemon_id, hp, attack, defense, sp_atk, sp_def, speed)
         return f'**{self.get_full_name_str(user, pokemon_id)}: Goal EVs**\n{goal_evs}'
 
     def remove_goal_evs_str(self, user, pokemon_id) -> str:
-        self.__check_user(user)
-        self.__check_pokemon_id(user, pokemon_id)
-        self.pokemon[user][pokemon_id].evs.goal_stats = None
-        return f'**{self.get_full_name_str(user, pokemon_id)}: Goal EVs**\n{self.pokemon[user][pokemon_id].evs.goal_stats}'
+        with self.state_lock:
+            self.__check_user(user)
+            self.__check_pokemon_id(user, pokemon_id)
+            self.pokemon[user][pokemon_id].evs.goal_stats = None
+            return f'**{self.get_full_name_str(user, pokemon_id)}: Goal EVs**\n{self.pokemon[user][pokemon_id].evs.goal_stats}'
 
     def set_evs_multiple_pokemon(self, user, pokemon_id_list, evs_list) -> list[PokemonStats]:
-        self.__check_user(user)
+        with self.state_lock:
+            self.__check_user(user)
 
-        # First verify all ids
-        for pokemon_id in pokemon_id_list:
-            self.__check_pokemon_id(user, pokemon_id)
+            # First verify all ids
+            for pokemon_id in pokemon_id_list:
+                self.__check_pokemon_id(user, pokemon_id)
 
-        # Verify the list lengths match
-        if len(pokemon_id_list) != len(evs_list):
-            raise PokemonTrackingException(f'Number of provided ids ({len(pokemon_id_list)}) is not equal to the number of provided evs ({len(evs_list)}).')
+            # Verify the list lengths match
+            if len(pokemon_id_list) != len(evs_list):
+                raise PokemonTrackingException(f'Number of provided ids ({len(pokemon_id_list)}) is not equal to the number of provided evs ({len(evs_list)}).')
 
-        # Add new EV's after IDs are verified
-        new_evs = []
-        for i in range(len(pokemon_id_list)):
-            self.pokemon[user][pokemon_id_list[i]].set_evs(evs_list[i])
-            new_evs.append(self.pokemon[user][pokemon_id_list[i]])
-        self.save_state()
-        return new_evs
+            # Add new EV's after IDs are verified
+            new_evs = []
+            for i in range(len(pokemon_id_list)):
+                self.pokemon[user][pokemon_id_list[i]].set_evs(evs_list[i])
+                new_evs.append(self.pokemon[user][pokemon_id_list[i]])
+            self.save_state()
+            return new_evs
 
     def set_evs_multiple_pokemon_str(self, user, pokemon_id_list, evs_list) -> str:
         self.set_evs_multiple_pokemon(user, pokemon_id_list, evs_list)
@@ -368,31 +441,33 @@ class _PokemonTrackingBase:
         return f'**{self.get_full_name_str(user, pokemon_id)}: Base Stats**\n{base_stats}'
 
     def set_ivs(self, user, pokemon_id, hp, attack, defense, sp_atk, sp_def, speed) -> tuple[PokemonStats, PokemonStats]:
-        self.__check_user(user)
-        self.__check_pokemon_id(user, pokemon_id)
+        with self.state_lock:
+            self.__check_user(user)
+            self.__check_pokemon_id(user, pokemon_id)
 
-        ivs = [stat.lower().replace(' ', '') for stat in [hp, attack, defense, sp_atk, sp_def, speed]]
-        try:
-            min_ivs = PokemonStats(*[_iv_name_map[name][0] for name in ivs])
-            max_ivs = PokemonStats(*[_iv_name_map[name][1] for name in ivs])
-        except KeyError:
-            raise PokemonTrackingException(f'Failed to determine IVs from provided keywords. IVs must be one of {list(_iv_name_map.keys())}.')
+            ivs = [stat.lower().replace(' ', '') for stat in [hp, attack, defense, sp_atk, sp_def, speed]]
+            try:
+                min_ivs = PokemonStats(*[_iv_name_map[name][0] for name in ivs])
+                max_ivs = PokemonStats(*[_iv_name_map[name][1] for name in ivs])
+            except KeyError:
+                raise PokemonTrackingException(f'Failed to determine IVs from provided keywords. IVs must be one of {list(_iv_name_map.keys())}.')
 
-        self.pokemon[user][pokemon_id].set_ivs(min_ivs, max_ivs)
-        self.save_state()
-        return (min_ivs, max_ivs)
+            self.pokemon[user][pokemon_id].set_ivs(min_ivs, max_ivs)
+            self.save_state()
+            return (min_ivs, max_ivs)
 
     def set_ivs_str(self, user, pokemon_id, hp, attack, defense, sp_atk, sp_def, speed) -> str:
         ivs_min, ivs_max = self.set_ivs(user, pokemon_id, hp, attack, defense, sp_atk, sp_def, speed)
         return f'**{self.get_full_name_str(user, pokemon_id)}: IVs**\n{get_stat_range_str(ivs_min, ivs_max)}'
 
     def set_ivs_exact(self, user, pokemon_id, min_ivs, max_ivs) -> tuple[PokemonStats, PokemonStats]:
-        self.__check_user(user)
-        self.__check_pokemon_id(user, pokemon_id)
+        with self.state_lock:
+            self.__check_user(user)
+            self.__check_pokemon_id(user, pokemon_id)
 
-        self.pokemon[user][pokemon_id].set_ivs(min_ivs, max_ivs)
-        self.save_state()
-        return (min_ivs, max_ivs)
+            self.pokemon[user][pokemon_id].set_ivs(min_ivs, max_ivs)
+            self.save_state()
+            return (min_ivs, max_ivs)
 
     def set_ivs_exact_str(self, user, pokemon_id, hp, attack, defense, sp_atk, sp_def, speed) -> str:
         ivs_min, ivs_max = self.set_ivs_exact(user, pokemon_id, hp, attack, defense, sp_atk, sp_def, speed)
@@ -407,19 +482,34 @@ class _PokemonTrackingBase:
         stats_min, stats_max = self.get_pokemon_stats(user, pokemon_id, level)
         return f'**{self.get_full_name_str(user, pokemon_id)}: Level {level} Stats**\n{get_stat_range_str(stats_min, stats_max)}'
 
+    def __get_pokemon(self, user, pokemon_id) -> Pokemon:
+        with self.state_lock:
+            self.__check_user(user)
+            self.__check_pokemon_id(user, pokemon_id)
+            return self.pokemon[user][pokemon_id]
+
+    def __check_unchanged(self, user, pokemon_id, pokemon: Pokemon):
+        # The state lock isn't held during lookups, so the pokemon may have been removed or moved in the meantime
+        if user not in self.pokemon or pokemon_id >= len(self.pokemon[user]) or self.pokemon[user][pokemon_id] is not pokemon:
+            raise PokemonTrackingException(f'Pokemon with ID {pokemon_id} changed while it was being looked up. Please try again.')
+
     def change_evolution(self, user, pokemon_id, new_pokemon_name) -> str:
-        self.__check_user(user)
-        self.__check_pokemon_id(user, pokemon_id)
-        self.pokemon[user][pokemon_id].change_evolution(new_pokemon_name)
-        self.save_state()
-        return self.get_full_name_str(user, pokemon_id)
+        pokemon = self.__get_pokemon(user, pokemon_id)
+        evolution = pokemon.resolve_evolution(new_pokemon_name)
+        with self.state_lock:
+            self.__check_unchanged(user, pokemon_id, pokemon)
+            pokemon.apply_evolution(*evolution)
+            self.save_state()
+            return self.get_full_name_str(user, pokemon_id)
 
     def change_form(self, user, pokemon_id, new_pokemon_name) -> str:
-        self.__check_user(user)
-        self.__check_pokemon_id(user, pokemon_id)
-        self.pokemon[user][pokemon_id].change_form(new_pokemon_name)
-        self.save_state()
-        return self.get_full_name_str(user, pokemon_id)
+        pokemon = self.__get_pokemon(user, pokemon_id)
+        form = pokemon.resolve_form(new_pokemon_name)
+        with self.state_lock:
+            self.__check_unchanged(user, pokemon_id, pokemon)
+            pokemon.apply_form(*form)
+            self.save_state()
+            return self.get_full_name_str(user, pokemon_id)
 
     def add_defeated_pokemon(self, user, defeated_pokemon_name, pokemon_id_list) -> list[PokemonStats]:
         pokemon_id_list = list(set(pokemon_id_list))
@@ -427,15 +517,17 @@ class _PokemonTrackingBase:
         ev_yield = pokemondb.get_ev_yield_as_stats(defeated_pokemon_name)
         evs_list = []
 
-        # First verify all ids
-        for pokemon_id in pokemon_id_list:
-            self.__check_pokemon_id(user, pokemon_id)
-
-        # Add new EV's after IDs are verified
-        for pokemon_id in pokemon_id_list:
-            self.pokemon[user][pokemon_id].evs += ev_yield
-            evs_list.append(self.pokemon[user][pokemon_id].evs)
-        self.save_state()
+        with self.state_lock:
+            # First verify all ids
+            self.__check_user(user)
+            for pokemon_id in pokemon_id_list:
+                self.__check_pokemon_id(user, pokemon_id)
+
+            # Add new EV's after IDs are verified
+            for pokemon_id in pokemon_id_list:
+                self.pokemon[user][pokemon_id].evs += ev_yield
+                evs_list.append(self.pokemon[user][pokemon_id].evs)
+            self.save_state()
         return evs_list
 
     def add_defeated_pokemon_str(self, user, defeated_pokemon_name, pokemon_id_list) -> str:
@@ -449,33 +541,35 @@ class _PokemonTrackingBase:
         return '\n\n'.join(responses)
 
     def consume_ev_vitamin(self, user, pokemon_id, vitamin, count=1):
-        self.__check_user(user)
-        self.__check_pokemon_id(user, pokemon_id)
-        try:
-            ev_change = _vitamins_map[vitamin.lower()]
-        except KeyError:
-            raise PokemonTrackingException(f'Failed to find EV changing vitamin with name {vitamin}. Options are: {list(_vitamins_map.keys())}.')
+        with self.state_lock:
+            self.__check_user(user)
+            self.__check_pokemon_id(user, pokemon_id)
+            try:
+                ev_change = _vitamins_map[vitamin.lower()]
+            except KeyError:
+                raise PokemonTrackingException(f'Failed to find EV changing vitamin with name {vitamin}. Options are: {list(_vitamins_map.keys())}.')
 
-        for _i in range(count):
-            self.pokemon[user][pokemon_id].evs += ev_change
-        self.save_state()
-        return self.pokemon[user][pokemon_id].evs
+            for _i in range(count):
+                self.pokemon[user][pokemon_id].evs += ev_change
+            self.save_state()
+            return self.pokemon[user][pokemon_id].evs
 
     def consume_ev_vitamin_str(self, user, pokemon_id, vitamin, count=1):
         return f'**{self.get_full_name_str(user, pokemon_id)}: EVs**\n{self.consume_ev_vitamin(user, pokemon_id, vitamin, count)}'
 
     def consume_ev_berry(self, user, pokemon_id, berry, count=1):
-        self.__check_user(user)
-        self.__check_pokemon_id(user, pokemon_id)
-        try:
-            ev_change = _berries_map[berry.lower()]
-        except KeyError:
-            raise PokemonTrackingException(f'Failed to find EV changing berry with name {berry}. Options are: {list(_berries_map.keys())}.')
+        with self.state_lock:
+            self.__check_user(user)
+            self.__check_pokemon_id(user, pokemon_id)
+            try:
+                ev_change = _berries_map[berry.lower()]
+            except KeyError:
+                raise PokemonTrackingException(f'Failed to find EV changing berry with name {berry}. Options are: {list(_berries_map.keys())}.')
 
-        for _i in range(count):
-            self.pokemon[user][pokemon_id].evs += ev_change
-        self.save_state()
-        return self.pokemon[user][pokemon_id].evs
+            for _i in range(count):
+                self.pokemon[user][pokemon_id].evs += ev_change
+            self.save_state()
+            return self.pokemon[user][pokemon_id].evs
 
     def consume_ev_berry_str(self, user, pokemon_id, berry, count=1):
         return f'**{self.get_full_name_str(user, pokemon_id)}: EVs**\n{self.consume_ev_berry(user, pokemon_id, berry, count)}'
@@ -491,11 +585,12 @@ class _PokemonTrackingBase:
         return f'{self.get_full_name_str(user, pokemon_id)}: **{self.pokemon[user][pokemon_id]._nature_name}**\n{self.pokemon[user][pokemon_id].nature}'
 
     def set_nature_str(self, user, pokemon_id, nature) -> str:
-        self.__check_user(user)
-        self.__check_pokemon_id(user, pokemon_id)
-        self.pokemon[user][pokemon_id].set_nature(nature)
-        self.save_state()
-        return f'{self.get_full_name_str(user, pokemon_id)}: **{self.pokemon[user][pokemon_id]._nature_name}**\n{self.pokemon[user][pokemon_id].nature}'
+        with self.state_lock:
+            self.__check_user(user)
+            self.__check_pokemon_id(user, pokemon_id)
+            self.pokemon[user][pokemon_id].set_nature(nature)
+            self.save_state()
+            return f'{self.get_full_name_str(user, pokemon_id)}: **{self.pokemon[user][pokemon_id]._nature_name}**\n{self.pokemon[user][pokemon_id].nature}'
 
     def get_nickname(self, user, pokemon_id) -> str:
         self.__check_user(user)
@@ -503,8 +598,9 @@ class _PokemonTrackingBase:
         return self.pokemon[user][pokemon_id].nickname
 
     def set_nickname_str(self, user, pokemon_id, nickname) -> str:
-        self.__check_user(user)
-        self.__check_pokemon_id(user, pokemon_id)
-        self.pokemon[user][pokemon_id].nickname = nickname
-        self.save_state()
-        return f'{self.get_full_name_str(user, pokemon_id)}'
+        with self.state_lock:
+            self.__check_user(user)
+            self.__check_pokemon_id(user, pokemon_id)
+            self.pokemon[user][pokemon_id].nickname = nickname
+            self.save_state()
+            return f'{self.get_full_name_str(user, pokemon_id)}'
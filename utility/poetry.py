@@ -1,37 +1,88 @@
+import functools
+import re
+import threading
+from typing import Optional
+
+from utility.syllables import get_syllable_table, normalize_word
+
 class PoetryError(Exception):
     pass
 
 class SyllableSchemeMismatchError(PoetryError):
     pass
 
-def get_syllable_count(word: str):
-    """ Counts the number of syllables in the input word. """
-    word = word.lower().replace('.', '').replace(',', '').replace('!', '').replace('?', '').replace(':', '').replace(';', '')
-    count = 0
-    vowels = 'aeiouy'
-    if word[0] in vowels:
-        count += 1
-    for index in range(1, len(word)):
-        if word[index] in vowels and word[index - 1] not in vowels:
-            count += 1
-        elif index > 1 and word[index] in vowels and word[index - 1] == 'y' and word[index - 2] in vowels:
-            count += 1
+# Every vowel group is a syllable, as is a vowel following a vowel and 'y' ("payee")
+_vowel_group = re.compile(r'[aeiouy]+')
+_vowel_after_y = re.compile(r'(?<=[aeiouy]y)[aeiouy]')
+_es_quiet_suffixes = ('mes', 'ves', 'thes', 'des')
+# Chat repeats the same few thousand words, so counts are memoized per normalized word
+_syllable_cache_size = 4096
+
+@functools.lru_cache(maxsize=_syllable_cache_size)
+def _count_syllables(word: str) -> int:
+    # Words in the pronunciation dictionary are counted exactly, the rest are estimated
+    table = get_syllable_table()
+    count = table.get(word) if table is not None else None
+    if count is not None:
+        return count
+
+    count = len(_vowel_group.findall(word)) + len(_vowel_after_y.findall(word))
     if word.endswith('e') and not word.endswith('le') or word.endswith('sed'):
         count -= 1
-    if word.endswith('es'):
-        es_quiet_prefixes = ['m', 'v', 'th', 'd']
-        for prefix in es_quiet_prefixes:
-            if word[(-2-len(prefix)):-2] == prefix:
-                count -= 1
-                break
+    if word.endswith(_es_quiet_suffixes):
+        count -= 1
     if count == 0:
         count += 1
     return count
 
+def get_syllable_count(word: str):
+    """ Counts the number of syllables in the input word. """
+    return _count_syllables(normalize_word(word))
+
+# Every word has at least one syllable. Abbreviations in the pronunciation dictionary have more syllables than letters ("w"), so the shortest message is bounded by its word count rather than its syllables.
+_min_word_syllables = 1
+# Longest word a message is allowed to average before it's too long to be poetry, well past any dictionary word
+_max_word_length = 24
+# Print the pre-filter stats after this many messages
+_prefilter_report_interval = 10000
+
+_g_prefilter_checked = 0
+_g_prefilter_rejected = 0
+_g_prefilter_lock = threading.Lock()
+
+def _record_prefilter(rejected: bool):
+    global _g_prefilter_checked, _g_prefilter_rejected
+    report = None
+    with _g_prefilter_lock:
+        _g_prefilter_checked += 1
+        _g_prefilter_rejected += int(rejected)
+        if _g_prefilter_checked % _prefilter_report_interval == 0:
+            report = f'Poetry pre-filter rejected {_g_prefilter_rejected} of {_g_prefilter_checked} messages without counting syllables.'
+    # Printed outside the lock, so other messages never wait on the log
+    if report is not None:
+        print(report)
+
+def get_prefilter_stats() -> dict[str, int]:
+    """ Returns how many messages the pre-filter of matches_syllables_scheme has checked, and how many it rejected. """
+    return {'checked': _g_prefilter_checked, 'rejected': _g_prefilter_rejected}
+
+def _prefilter(potential_poetry: str, syllable_counts: list[int]) -> Optional[list[str]]:
+    # Bounds any message matching the scheme must be within, checked before any syllable is counted
+    total_syllables = sum(syllable_counts)
+    max_words = total_syllables // _min_word_syllables
+    if len(potential_poetry) < 2 * len(syllable_counts) - 1 or len(potential_poetry) > max_words * (_max_word_length + 1):
+        return None
+    words = potential_poetry.split()
+    # Every line needs at least one word
+    if len(words) < len(syllable_counts) or len(words) > max_words:
+        return None
+    return words
+
 def matches_syllables_scheme(potential_poetry: str, syllable_counts: list[int]) -> list[str]:
     """
     Checks to see if input string matches the provided syllable scheme.
     Throws SyllableSchemeMismatchError if the potential_poetry scheme doesn't match.
+    Strings with too few or too many words or characters for the scheme are rejected before any syllables are counted.
 
         Parameters:
             potential_poetry (str): Input string to check against.
@@ -46,7 +97,10 @@ def matches_syllables_scheme(potential_poetry: str, syllable_counts: list[int])
             Throws:
                 - SyllableSchemeMismatchError
     """
-    words = potential_poetry.strip().replace('\n', ' ').replace('\r', ' ').replace('  ', ' ').split(' ')
+    words = _prefilter(potential_poetry, syllable_counts)
+    _record_prefilter(words is None)
+    if words is None:
+        raise SyllableSchemeMismatchError('Input string can\'t match the syllable scheme.')
     lines = [[]]
     syllables = list(syllable_counts)
     line_idx = 0
@@ -0,0 +1,149 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+
+SYLLABLE_TABLE_VERSION = 1
+
+_default_table_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'syllables.bin')
+
+# File layout, little endian:
+#   header: magic, version, word count
+#   offsets: word count + 1 uint32 offsets of each word in the string table, so word i is strings[offsets[i]:offsets[i + 1]]
+#   syllables: word count uint8 syllable counts
+#   strings: the normalized words, UTF-8, sorted bytewise and concatenated
+_magic = b'SYLT'
+_header = struct.Struct('<4sII')
+
+# Punctuation dropped from a word before its syllables are counted
+_punctuation_table = str.maketrans('', '', '.,!?:;')
+
+class SyllableTableException(Exception):
+    """ Base exception class for this module. """
+    pass
+
+def normalize_word(word: str) -> str:
+    """ Returns the form of a word that syllables are counted and looked up by: lower case, without punctuation. """
+    return word.lower().translate(_punctuation_table)
+
+class SyllableTable:
+    """
+    Read-only syllable counts compiled from a pronunciation dictionary, memory mapped from disk.
+    Opening the table reads only its header, and every process mapping the same file shares its pages.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if sys.byteorder != 'little':
+            raise SyllableTableException(f'Syllable table {path} is little endian and can\'t be mapped on this machine.')
+        try:
+            with open(path, 'rb') as table_file:
+                self.__map = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, count = _header.unpack_from(self.__map, 0)
+        except (OSError, ValueError, struct.error) as e:
+            raise SyllableTableException(f'Failed to open syllable table {path}. Error: {e}')
+        if magic != _magic or version != SYLLABLE_TABLE_VERSION:
+            raise SyllableTableException(f'Syllable table {path} has version {version}, expected {SYLLABLE_TABLE_VERSION}.')
+
+        self.count = count
+        syllables_start = _header.size + 4 * (count + 1)
+        self.__strings_start = syllables_start + count
+        view = memoryview(self.__map)
+        self.__offsets = view[_header.size:syllables_start].cast('I')
+        self.__syllables = view[syllables_start:self.__strings_start]
+
+    def __word(self, index: int) -> bytes:
+        return self.__map[self.__strings_start + self.__offsets[index]:self.__strings_start + self.__offsets[index + 1]]
+
+    def get(self, word: str) -> int:
+        """ Returns the syllable count of a normalized word, or None if the dictionary doesn't have it. """
+        key = word.encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.__word(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.__word(low) == key:
+            return self.__syllables[low]
+        return None
+
+_g_table = None
+_g_table_loaded = False
+_g_table_lock = threading.Lock()
+
+def get_syllable_table() -> SyllableTable:
+    """
+    Returns the syllable table, mapping it on first use.
+    The path is read from the POETRY_SYLLABLE_TABLE_PATH environment variable, falling back to utility/data/syllables.bin.
+
+        Returns:
+            table (SyllableTable): The mapped table, or None if no usable table exists
+    """
+    global _g_table, _g_table_loaded
+    if not _g_table_loaded:
+        with _g_table_lock:
+            if not _g_table_loaded:
+                path = os.environ.get('POETRY_SYLLABLE_TABLE_PATH', _default_table_path)
+                if os.path.isfile(path):
+                    try:
+                        _g_table = SyllableTable(path)
+                        print(f'Mapped syllable table {path} with {_g_table.count} words.')
+                    except SyllableTableException as e:
+                        print(f'Failed to map syllable table. Error: {e}')
+                else:
+                    print(f'No syllable table found at {path}. All syllables will be estimated.')
+                _g_table_loaded = True
+    return _g_table
+
+def _read_pronunciations(cmudict_path: str) -> dict[str, int]:
+    # Lines: WORD  PH ON EH1 MZ, with alternate pronunciations as WORD(2). Vowel phones carry a stress digit, one per syllable.
+    counts = {}
+    with open(cmudict_path, encoding='latin-1') as cmudict_file:
+        for line in cmudict_file:
+            fields = line.split('#', 1)[0].split()
+            if len(fields) < 2 or line.startswith(';;;'):
+                continue
+            word = normalize_word(fields[0].split('(', 1)[0])
+            if word:
+                # The first pronunciation listed is the most common one
+                counts.setdefault(word, max(1, min(255, sum(1 for phone in fields[1:] if phone[-1].isdigit()))))
+    return counts
+
+def build_syllable_table(cmudict_path: str, path: str) -> int:
+    """
+    Builds a syllable table from a CMU style pronunciation dictionary (cmudict.dict or cmudict-0.7b).
+
+        Parameters:
+            cmudict_path (str): Path of the pronunciation dictionary
+            path (str): Output path of the syllable table. Any existing file is replaced.
+
+        Returns:
+            count (int): Number of words in the table
+    """
+    entries = sorted((word.encode('utf-8'), count) for word, count in _read_pronunciations(cmudict_path).items())
+    offsets = [0]
+    for word, _count in entries:
+        offsets.append(offsets[-1] + len(word))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as table_file:
+        table_file.write(_header.pack(_magic, SYLLABLE_TABLE_VERSION, len(entries)))
+        table_file.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        table_file.write(bytes(count for _word, count in entries))
+        table_file.write(b''.join(word for word, _count in entries))
+    os.replace(tmp_path, path)
+    return len(entries)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build a syllable table from a CMU style pronunciation dictionary.')
+    parser.add_argument('cmudict', help='Pronunciation dictionary with one "WORD PH ON EH1 MZ" entry per line, such as cmudict.dict.')
+    parser.add_argument('output', nargs='?', default=os.environ.get('POETRY_SYLLABLE_TABLE_PATH', _default_table_path),
+        help='Output path of the syllable table.')
+    args = parser.parse_args()
+    count = build_syllable_table(args.cmudict, args.output)
+    print(f'Wrote {count} words to {args.output}.')